@@ -1,20 +1,31 @@
-from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import Runnable
+from app.utils.cache import LRUCache
+from app.utils.catalog import candidate_catalog
 from app.utils.config import settings
-from app.utils.embedding import load_chroma
+from app.utils.context_builder import build_context, estimate_tokens
+from app.utils.limiter import ollama_limiter
+from app.utils.embedding import get_vectorstore, get_embedding_model, get_active_index, get_chunk_id, get_chunk_candidate, get_lexical_index, WRITER_ID
+from app.utils.text import hash_text, preprocess, tokenize_cv
+from app.utils.lexical_index import reciprocal_rank_fusion
 from app.utils.logger import log_debug
+from app.utils.metrics import StreamTimer, Trace, span
+from app.utils.registry import registry
 from langchain_core.documents import Document
-from collections import defaultdict
+import asyncio
+import re
 
-llm = ChatOllama(
-    model=settings.LLM_MODEL,
-    temperature=0.2,
-    streaming=True
-)
+# Name parts that are also common words or skills; a question mentioning them is not about that candidate
+NOT_NAME_PARTS = {
+    "will", "mark", "ruby", "grace", "hope", "faith", "joy", "rose", "may", "june", "april", "august", "bill",
+    "frank", "jack", "pat", "sue", "rich", "chase", "art", "dean", "guy", "miles", "max", "ray", "sage", "amber",
+    "crystal", "dart", "swift", "rust", "julia", "scala", "spring", "flask", "go", "elm", "perl", "angular"
+}
 
-vectorstore = load_chroma()
-retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 15})
+answer_cache = LRUCache(settings.ANSWER_CACHE_SIZE)
+query_embedding_cache = LRUCache(settings.QUERY_EMBEDDING_CACHE_SIZE)
+cached_index_version = None
+known_candidates = None
 
 prompt = ChatPromptTemplate.from_template("""
 You are a skilled recruitment assistant. The context below contains partial excerpts from candidate CVs.
@@ -35,28 +46,215 @@ Answer:
 """)
 
 
-chain = prompt | llm
+def create_chain():
+    from langchain_ollama import ChatOllama
+    llm = ChatOllama(
+        model=settings.LLM_MODEL,
+        temperature=0.2,
+        streaming=True,
+        base_url=settings.OLLAMA_BASE_URL
+    )
+    return prompt | llm
 
-def stream_answer(question: str):
-    # Retrieve documents
-    docs: list[Document] = retriever.invoke(question)
-
-    # Group chunks by candidate filename
-    grouped_docs = defaultdict(list)
-    for doc in docs:
-        key = doc.metadata.get("candidate_name", "unknown")
-        grouped_docs[key].append(doc.page_content)
-
-    # Construct context block for each candidate
-    full_context = ''
-    for candidate, texts in grouped_docs.items():
-        block = "\n".join(texts)
-        full_context = full_context + '\n' +f'------The following chunk belongs to {candidate}------' + '\n'
-        full_context = full_context + block + '\n\n'
+registry.register("chat_chain", create_chain)
+
+def normalize_question(question: str) -> str:
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip("?!. ")
+
+def embed_question(question: str) -> list[float]:
+    key = (settings.EMBEDDING_MODEL, normalize_question(question))
+    embedding = query_embedding_cache.get(key)
+    if embedding is None:
+        with span("query_embed"):
+            embedding = get_embedding_model().embed_query(question)
+        query_embedding_cache.set(key, embedding)
+    return embedding
+
+def get_doc_id(doc: Document) -> str:
+    metadata = doc.metadata
+    return doc.id or get_chunk_id(metadata.get("candidate_name", "unknown"), metadata.get("content_hash", ""), metadata.get("chunk_index", 0))
+
+class CandidateMatcher:
+    # Built once per index version, so a question costs one pass over its own words, not a scan of every name
+    def __init__(self, candidates: list[str]):
+        from app.utils.skill_matcher import SkillMatcher
+        self.candidates = candidates
+        # Whole names, matched on word boundaries by the same token-level Aho-Corasick the skill counter uses
+        self.full_names = SkillMatcher([[preprocess(name)] for name in candidates])
+        # First or last name -> every multi-word candidate carrying it
+        self.name_parts = {}
+        for name in candidates:
+            parts = name.lower().split()
+            if len(parts) > 1:
+                for part in dict.fromkeys(parts):
+                    self.name_parts.setdefault(part, []).append(name)
+
+    def detect(self, question: str) -> list[str]:
+        counts = self.full_names.count(tokenize_cv(preprocess(question)))
+        full_matches = [name for name, count in zip(self.candidates, counts) if count]
+        if full_matches:
+            return full_matches
+
+        # Fall back to a single first or last name ("What did Sara do at Vodafone?"). Only capitalised words count,
+        # and not ones that are also ordinary words or skills ("Who knows Ruby?"), so a stray word never narrows
+        # retrieval to one candidate.
+        tokens = {token.lower() for token in re.findall(r"\b[A-Z][\w'-]*", question)} - NOT_NAME_PARTS
+        partial_matches = []
+        for token in tokens:
+            matches = self.name_parts.get(token, [])
+            if len(matches) > 1:
+                # Two candidates share the name; searching everyone beats guessing
+                return []
+            partial_matches.extend(match for match in matches if match not in partial_matches)
+        return partial_matches
+
+def get_candidate_matcher() -> CandidateMatcher:
+    global known_candidates
+    # Refreshed whenever the index version changes (see prepare_answer)
+    if known_candidates is None:
+        known_candidates = CandidateMatcher(candidate_catalog.names())
+    return known_candidates
+
+def detect_candidates(question: str) -> list[str]:
+    return get_candidate_matcher().detect(question)
+
+def load_full_cv(candidate: str) -> Document | None:
+    text = candidate_catalog.read_text(candidate)
+    if text is None:
+        return None
+    content_hash = hash_text(text)
+    return Document(
+        page_content=text,
+        metadata={"candidate_name": candidate, "content_hash": content_hash},
+        id=f"{candidate}:{content_hash[:16]}:full"
+    )
+
+def candidate_search(question: str, candidates: list[str], k: int = None) -> list[Document]:
+    # Small CVs fit in the prompt whole, so there's nothing to rank
+    docs = []
+    large = []
+    for candidate in candidates:
+        doc = load_full_cv(candidate)
+        if doc is not None and estimate_tokens(doc.page_content) <= settings.SMALL_CV_TOKENS:
+            docs.append(doc)
+        else:
+            large.append(candidate)
+
+    if large:
+        docs.extend(hybrid_search(question, k=k, candidates=large))
+    return docs
+
+def hybrid_search(question: str, k: int = None, candidates: list[str] = None) -> list[Document]:
+    k = k or settings.RETRIEVER_K
+    fetch_k = max(k, settings.RETRIEVER_FETCH_K)
+
+    vector_filter = None
+    chunk_filter = None
+    if candidates:
+        vector_filter = {"candidate_name": candidates[0]} if len(candidates) == 1 else {"candidate_name": {"$in": candidates}}
+        allowed = set(candidates)
+        chunk_filter = lambda chunk_id: get_chunk_candidate(chunk_id) in allowed
+
+    # Both indexes come from the same collection even if a rebuild swaps the active one mid-question
+    collection = get_active_index()["collection"]
+    vectorstore = get_vectorstore(collection)
+    vector_docs = vectorstore.similarity_search_by_vector(embed_question(question), k=fetch_k, filter=vector_filter)
+    docs_by_id = {get_doc_id(doc): doc for doc in vector_docs}
+    lexical_ids = [chunk_id for chunk_id, _ in get_lexical_index(collection).search(question, k=fetch_k, chunk_filter=chunk_filter)]
+
+    # Exact tokens like "C#" or a university name rank well lexically even when the embedding misses them
+    fused_ids = reciprocal_rank_fusion([list(docs_by_id), lexical_ids])[:k]
+
+    missing = [chunk_id for chunk_id in fused_ids if chunk_id not in docs_by_id]
+    if missing:
+        records = vectorstore._collection.get(ids=missing, include=["documents", "metadatas"])
+        for chunk_id, text, metadata in zip(records["ids"], records["documents"], records["metadatas"]):
+            docs_by_id[chunk_id] = Document(page_content=text, metadata=metadata or {}, id=chunk_id)
+
+    return [docs_by_id[chunk_id] for chunk_id in fused_ids if chunk_id in docs_by_id]
+
+def replay_answer(answer: str):
+    # Re-emit a cached answer in word-sized pieces so it renders like a live stream
+    for piece in re.findall(r"\S+\s*|\s+", answer):
+        yield piece
+
+def get_cache_stats() -> dict:
+    return {"answers": answer_cache.get_stats(), "query_embeddings": query_embedding_cache.get_stats()}
+
+def prepare_answer(question: str) -> tuple[tuple, str | None, str | None]:
+    # Everything before generation: returns (cache key, cached answer, context), with no context on a cache hit
+    global cached_index_version, known_candidates
+
+    # Answers from an older index are unreachable (the version is part of the key); drop them to free the slots
+    active = get_active_index()
+    index_version = active["version"]
+    if index_version != cached_index_version:
+        answer_cache.clear()
+        # Only another process's lexical index has to be re-read. This process's writers update the shared
+        # instance in place, and reloading it would drop whatever they added since their last save.
+        if cached_index_version is not None and active.get("writer") != WRITER_ID:
+            get_lexical_index(active["collection"]).load()
+        known_candidates = None
+        cached_index_version = index_version
+
+    # Retrieve documents, restricted to the named candidates when the question mentions any
+    with span("retrieval"):
+        candidates = detect_candidates(question)
+        if candidates:
+            docs: list[Document] = candidate_search(question, candidates)
+            candidate_quota = max(settings.CONTEXT_CANDIDATE_QUOTA, settings.CONTEXT_TOKEN_BUDGET // len(candidates))
+        else:
+            docs: list[Document] = hybrid_search(question)
+            candidate_quota = settings.CONTEXT_CANDIDATE_QUOTA
+
+    cache_key = (normalize_question(question), tuple(get_doc_id(doc) for doc in docs), index_version)
+    cached_answer = answer_cache.get(cache_key)
+    if cached_answer is not None:
+        return cache_key, cached_answer, None
+
+    # Group chunks by candidate, stitching overlapping neighbours and trimming to the token budget
+    with span("context_build"):
+        full_context = build_context(docs, settings.CONTEXT_TOKEN_BUDGET, candidate_quota)
     
     log_debug(question, full_context)
-    
-    # Stream the response from LLM
-    for chunk in chain.stream({"question": question, "context": full_context}):
-        yield chunk.content
+    return cache_key, None, full_context
+
+def finish_answer(cache_key: tuple, response: str):
+    # Only complete answers are cached; an abandoned stream never gets here
+    answer_cache.set(cache_key, response)
+
+def stream_answer(question: str):
+    with StreamTimer("chat", Trace("chat")) as timer:
+        cache_key, cached_answer, full_context = timer.trace.run(prepare_answer, question)
+        if cached_answer is not None:
+            timer.outcome = "cached"
+            yield from replay_answer(cached_answer)
+            return
+
+        # Stream the response from LLM
+        response = ""
+        with ollama_limiter:
+            for chunk in registry.get("chat_chain").stream({"question": question, "context": full_context}):
+                timer.token()
+                response += chunk.content
+                yield chunk.content
+        finish_answer(cache_key, response)
+
+async def astream_answer(question: str):
+    with StreamTimer("chat", Trace("chat")) as timer:
+        # Retrieval is blocking (Chroma, embeddings, disk), so it runs off the event loop
+        cache_key, cached_answer, full_context = await asyncio.to_thread(timer.trace.run, prepare_answer, question)
+        if cached_answer is not None:
+            timer.outcome = "cached"
+            for piece in replay_answer(cached_answer):
+                yield piece
+            return
 
+        response = ""
+        async with ollama_limiter:
+            async for chunk in registry.get("chat_chain").astream({"question": question, "context": full_context}):
+                timer.token()
+                response += chunk.content
+                yield chunk.content
+        finish_answer(cache_key, response)
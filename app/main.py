@@ -1,5 +1,6 @@
 import gradio as gr
-from app.utils.callbacks import stream_chat_interface, upload_and_process_files, store_structured_files, store_to_vector_db, clear_uploads, stream_summary_response, update_choices, skill_scoring_interface_single_skill, skill_scoring_interface_single_candidate, update_candidate_choices
+from app.utils.config import settings
+from app.utils.callbacks import stream_chat_interface, upload_and_process_files, rebuild_vector_db, clear_uploads, poll_ingest_job, cancel_ingest_job, get_ingest_status, discard_session_jobs, stream_summary_response, update_choices, skill_scoring_interface_single_skill, skill_scoring_interface_single_candidate, update_candidate_choices, rank_candidates_interface
         
 
 with gr.Blocks(title="Smart Recruiter Assistant", css="""
@@ -44,18 +45,29 @@ with gr.Blocks(title="Smart Recruiter Assistant", css="""
             )
 
             with gr.Row(elem_id="status-row"):
-                upload_status = gr.Label(value="", label="Upload", elem_classes=["status-box"])
-                process_status = gr.Label(value="", label="Process", elem_classes=["status-box"])
-                store_status = gr.Label(value="", label="Storage", elem_classes=["status-box"])
+                upload_status = gr.Label(value="", label="Parse", elem_classes=["status-box"])
+                process_status = gr.Label(value="", label="Names", elem_classes=["status-box"])
+                store_status = gr.Label(value="", label="Search Index", elem_classes=["status-box"])
 
-            process_btn = gr.Button("🔄 Process Files")
-            store_btn = gr.Button("🧠 Save to Database")
-            clear_btn = gr.Button("🧹 Clear All", variant="stop")
-
-            file_upload.upload(upload_and_process_files, inputs=file_upload, outputs=upload_status)
-            process_btn.click(store_structured_files, inputs=None, outputs=process_status)
-            store_btn.click(store_to_vector_db, inputs=None, outputs=store_status)
+            rebuild_btn = gr.Button("♻️ Rebuild Index")
+            with gr.Row():
+                cancel_btn = gr.Button("⏹️ Cancel")
+                clear_btn = gr.Button("🧹 Clear All", variant="stop")
+
+            # Uploading starts a background job that takes each CV through to the search index; the timer reports progress
+            ingest_timer = gr.Timer(1.0, active=False)
+            file_upload.upload(upload_and_process_files, inputs=file_upload, outputs=[upload_status, ingest_timer])
+            rebuild_btn.click(rebuild_vector_db, inputs=None, outputs=[store_status, ingest_timer])
+            cancel_btn.click(cancel_ingest_job, inputs=None, outputs=None)
             clear_btn.click(clear_uploads, inputs=None, outputs=[upload_status,process_status])
+            ingest_timer.tick(
+                poll_ingest_job,
+                inputs=None,
+                outputs=[upload_status, process_status, store_status, ingest_timer],
+                show_progress="hidden",
+                concurrency_limit=None
+            )
+            gr.api(get_ingest_status, api_name="ingest_status")
 
         with gr.Tab("💬 CV Chatbot"):
             chatbot = gr.Chatbot(height=600)
@@ -74,13 +86,17 @@ with gr.Blocks(title="Smart Recruiter Assistant", css="""
             send_btn.click(
                 fn=stream_chat_interface,
                 inputs=[txt, state],
-                outputs=[chatbot, state, txt]
+                outputs=[chatbot, state, txt],
+                concurrency_limit=settings.CHAT_CONCURRENCY,
+                concurrency_id="chat"
             )
 
             txt.submit(
                 fn=stream_chat_interface,
                 inputs=[txt, state],
-                outputs=[chatbot, state, txt]
+                outputs=[chatbot, state, txt],
+                concurrency_limit=settings.CHAT_CONCURRENCY,
+                concurrency_id="chat"
             )
         
         with gr.Tab("📄 CV Summarizer") as summarizer_tab:
@@ -110,7 +126,9 @@ with gr.Blocks(title="Smart Recruiter Assistant", css="""
             summarize_btn.click(
                 fn=stream_summary_response,
                 inputs=[candidate_dropdown],
-                outputs=[cv_summary_display]
+                outputs=[cv_summary_display],
+                concurrency_limit=settings.SUMMARY_CONCURRENCY,
+                concurrency_id="summary"
             )
         
         with gr.Tab("📊 Skill Assessor"):
@@ -119,7 +137,7 @@ with gr.Blocks(title="Smart Recruiter Assistant", css="""
             with gr.Row():
                 skill_input = gr.Textbox(
                     label="Enter Skills (comma-separated)", 
-                    placeholder="e.g., Python, TensorFlow, Docker",
+                    placeholder="e.g., Python, TensorFlow, Docker (optional weights: Python:3, Docker:1)",
                     scale=10
                 )
                 score_button = gr.Button("Assess Candidate Skills", scale=2)
@@ -131,7 +149,9 @@ with gr.Blocks(title="Smart Recruiter Assistant", css="""
                 skill_selector.change(
                     fn=skill_scoring_interface_single_skill,
                     inputs=[skill_input,skill_selector],
-                    outputs=plot_output
+                    outputs=plot_output,
+                    concurrency_limit=settings.SKILL_CONCURRENCY,
+                    concurrency_id="skills"
                 )
             with gr.Tab('👤 Candidate Focus View'):
                 candidate_dropdown_skills = gr.Dropdown(label="Select a Candidate",choices=[])
@@ -140,7 +160,24 @@ with gr.Blocks(title="Smart Recruiter Assistant", css="""
                 candidate_dropdown_skills.change(
                     fn = skill_scoring_interface_single_candidate,
                     inputs=[skill_input, candidate_dropdown_skills],
-                    outputs=plot_output_candidate
+                    outputs=plot_output_candidate,
+                    concurrency_limit=settings.SKILL_CONCURRENCY,
+                    concurrency_id="skills"
+                )
+
+            with gr.Tab('🏆 Rank Candidates'):
+                with gr.Row():
+                    top_n_input = gr.Number(label="Top N", value=10, precision=0, minimum=1, scale=10)
+                    rank_button = gr.Button("Rank candidates", scale=2)
+                rank_table = gr.Dataframe(label="Ranking", interactive=False)
+                plot_output_ranking = gr.Plot()
+
+                rank_button.click(
+                    fn=rank_candidates_interface,
+                    inputs=[skill_input, top_n_input],
+                    outputs=[rank_table, plot_output_ranking],
+                    concurrency_limit=settings.SKILL_CONCURRENCY,
+                    concurrency_id="skills"
                 )
                 
             score_button.click(
@@ -155,7 +192,7 @@ with gr.Blocks(title="Smart Recruiter Assistant", css="""
             - The chart shows **how often each candidate mentioned a specific skill**.
             - Use the skill dropdown to select one skill at a time.
             - Bars represent candidates; the length of the bar shows mention frequency.
-            - The count is based on exact and related keyword appearances in the CV.
+            - The count is based on exact and related keyword appearances in the CV (e.g. "k8s" counts towards Kubernetes, "tf" towards TensorFlow).
 
             This is helpful for **quickly spotting which candidates emphasize certain skills**.
             """)
@@ -169,6 +206,6 @@ with gr.Blocks(title="Smart Recruiter Assistant", css="""
             Always combine automated scores with human judgment.
             """, elem_classes=["text-xs", "text-gray-500"])
 
+    app.unload(discard_session_jobs)
 
-            
-            
\ No newline at end of file
+app.queue(max_size=settings.QUEUE_MAX_SIZE, default_concurrency_limit=settings.DEFAULT_CONCURRENCY)
@@ -1,63 +1,17 @@
-from pathlib import Path
-from sklearn.feature_extraction.text import TfidfVectorizer
-from typing import List
-import re
-import pandas as pd
 import math
+from app.utils.catalog import candidate_catalog
 from app.utils.config import settings
+from app.utils.registry import registry
+from app.utils.text import preprocess
 
-def read_cvs_from_directory() -> dict:
-    directory = Path(settings.CVS_DIR)
-    if not directory.exists() or not directory.is_dir():
-        raise ValueError(f"Invalid directory: {settings.CVS_DIR}")
-    
-    cv_dict = {}
-    for file in directory.glob("*.txt"):
-        stem = file.stem
-        text = file.read_text(encoding="utf-8")
-        cv_dict[stem] = text
-    return cv_dict
-
-def preprocess(text: str) -> str:
-    # Lowercase everything
-    text = text.lower()
-    
-    # Replace underscores, dashes, commas with spaces
-    text = re.sub(r"[_\-,]", " ", text)
-    
-    # Remove dots at the end of sentences (but not in e.g., ".net" or "node.js")
-    text = re.sub(r"\.(?=\s|$)", "", text)  # removes . only if followed by whitespace or end of line
-
-    # Keep only alphanumerics and relevant symbols (+, #, .) — discard the rest
-    text = re.sub(r"[^a-z0-9+#. ]+", " ", text)
-
-    # Collapse multiple spaces into one
-    text = re.sub(r"\s+", " ", text).strip()
-
-    return text
-
-def tokenize_cv(text: str) -> list:
-    return text.split()
-
-def compute_tfidf_matrix(cv_dict: dict):
-    cv_ids = list(cv_dict.keys())
-    preprocessed = [preprocess(cv_dict[cv_id]) for cv_id in cv_ids]
-    
-    vectorizer = TfidfVectorizer(ngram_range=(1,4), use_idf=False, norm=None, tokenizer=tokenize_cv)
-    tfidf_matrix = vectorizer.fit_transform(preprocessed)
-    
-    return vectorizer, tfidf_matrix, cv_ids
-
-def compute_skill_score(tfidf_matrix, vectorizer, skill: str, cv_id: str, cv_ids: list) -> float:
-    skill = skill.lower()
-    if skill not in vectorizer.vocabulary_:
-        return 0.0
-    if cv_id not in cv_ids:
-        raise ValueError(f"CV ID '{cv_id}' not found in the provided list.")
-
-    index = vectorizer.vocabulary_[skill]
-    row = cv_ids.index(cv_id)
-    return float(tfidf_matrix[row, index])
+def create_skill_counter():
+    from app.utils.skill_matcher import SkillCounter, TokenStore, load_synonyms
+    # Left behind by the n-gram vocabulary this replaced
+    (settings.CACHE_DIR / "ngram_index.joblib").unlink(missing_ok=True)
+    tokens = TokenStore(settings.CACHE_DIR / "skill_tokens.sqlite")
+    return SkillCounter(candidate_catalog, tokens, load_synonyms(settings.SKILL_SYNONYMS_FILE), settings.SKILL_CACHE_SIZE)
+
+registry.register("skill_counter", create_skill_counter)
 
 def normalize_frequencies(freqs: list[int]) -> list[float]:
     log_scaled = []
@@ -74,21 +28,62 @@ def normalize_frequencies(freqs: list[int]) -> list[float]:
     normalized = [round(val, 4) for val in log_scaled]
     return normalized
 
+def parse_weighted_skills(skill_input: str) -> dict[str, float]:
+    # "Python:3, Docker, Kubernetes:2" -> {"Python": 3.0, "Docker": 1.0, "Kubernetes": 2.0}
+    weighted = {}
+    for item in skill_input.split(","):
+        skill, weight = item.strip(), 1.0
+        name, sep, value = skill.rpartition(":")
+        if sep:
+            try:
+                skill, weight = name.strip(), float(value)
+            except ValueError:
+                pass
+        if skill:
+            weighted[skill] = weighted.get(skill, 0.0) + weight
+    return weighted
+
 def skill_scoring(skill_input: str):
-    skills = [s.strip() for s in skill_input.split(",") if s.strip()]
-    skills = [preprocess(s) for s in skills]
+    import pandas as pd
+    skills = list(dict.fromkeys(preprocess(s) for s in parse_weighted_skills(skill_input)))
+    skills = [s for s in skills if s]
     if not skills:
         return pd.DataFrame(columns=["Candidate"] + skills)
 
-    cv_dict = read_cvs_from_directory()
-    vectorizer, tfidf_matrix, cv_ids = compute_tfidf_matrix(cv_dict)
-
-    raw_data = []
-    for cv_id in cv_ids:
-        row = [compute_skill_score(tfidf_matrix, vectorizer, skill, cv_id, cv_ids) for skill in skills]
-        raw_data.append(row)
+    cv_ids, counts = registry.get("skill_counter").lookup(skills)
 
-    df = pd.DataFrame(raw_data, columns=skills)
+    df = pd.DataFrame(counts.astype(float), columns=skills)
     df.insert(0, "Candidate", cv_ids)
 
     return df
+
+def rank_candidates(skill_input: str, top_n: int = 10):
+    import numpy as np
+    import pandas as pd
+    weighted = {}
+    for skill, weight in parse_weighted_skills(skill_input).items():
+        skill = preprocess(skill)
+        if skill:
+            weighted[skill] = weighted.get(skill, 0.0) + weight
+    if not weighted:
+        return pd.DataFrame(columns=["Candidate", "Score"])
+
+    skills = list(weighted)
+    cv_ids, counts = registry.get("skill_counter").lookup(skills)
+    if not cv_ids:
+        return pd.DataFrame(columns=["Candidate", "Score"] + skills)
+
+    # Same log(f + 1) damping as normalize_frequencies, so one skill repeated
+    # dozens of times doesn't drown out the rest of the requirement list
+    weights = np.array([weighted[s] for s in skills])
+    scores = np.log1p(counts) @ weights
+
+    top_n = max(1, min(int(top_n), len(cv_ids)))
+    top = np.argpartition(-scores, top_n - 1)[:top_n]
+    top = top[np.argsort(-scores[top], kind="stable")]
+
+    df = pd.DataFrame(counts[top], columns=skills)
+    df.insert(0, "Score", np.round(scores[top], 4))
+    df.insert(0, "Candidate", [cv_ids[i] for i in top])
+
+    return df
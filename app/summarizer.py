@@ -1,14 +1,15 @@
-from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import Runnable
+from app.utils.cache import DiskCache
 from app.utils.config import settings
+from app.utils.limiter import background_limiter
 from app.utils.logger import log_debug
-
-llm = ChatOllama(
-    model=settings.LLM_MODEL,
-    temperature=0.27,
-    streaming=True
-)
+from app.utils.metrics import StreamTimer, Trace, span
+from app.utils.registry import registry
+from app.utils.text import hash_text
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
 
 prompt = ChatPromptTemplate.from_template("""
 You are an expert recruitment assistant. Read the full CV of a candidate and generate a professional, well-structured summary.
@@ -35,9 +36,110 @@ CV:
 Summary:
 """)
 
-summary_chain = prompt | llm
+def create_summary_chain():
+    from langchain_ollama import ChatOllama
+    llm = ChatOllama(
+        model=settings.LLM_MODEL,
+        temperature=0.27,
+        streaming=True,
+        base_url=settings.OLLAMA_BASE_URL
+    )
+    return prompt | llm
+
+registry.register("summary_chain", create_summary_chain)
+
+# Bump whenever the prompt changes so stored summaries are regenerated
+PROMPT_VERSION = 1
+
+summary_store = DiskCache(settings.CACHE_DIR / "summaries.sqlite")
+
+summary_executor = None
+summary_executor_lock = threading.Lock()
+pending_summaries = set()
+
+def get_summary_key(cv: str) -> str:
+    return f"{settings.LLM_MODEL}:v{PROMPT_VERSION}:{hash_text(cv)}"
+
+def get_stored_summary(cv: str) -> str | None:
+    stored = summary_store.get(get_summary_key(cv))
+    return stored.decode("utf-8") if stored is not None else None
+
+def timed_stored_summary(cv: str) -> str | None:
+    with span("summary_lookup"):
+        return get_stored_summary(cv)
+
+def prepare_summary(cv: str) -> str | None:
+    # Returns the stored summary, if any; otherwise the CV is about to be summarized
+    stored = timed_stored_summary(cv)
+    if stored is None:
+        log_debug("Summarizing CV", cv[:500])
+    return stored
+
+def finish_summary(cv: str, response: str):
+    summary_store.set(get_summary_key(cv), response.encode("utf-8"))
 
 def stream_summary(cv: str):
-    log_debug("Summarizing CV", cv[:500])
-    for chunk in summary_chain.stream({"cv": cv}):
-        yield chunk.content
+    with StreamTimer("summary", Trace("summary")) as timer:
+        stored = timer.trace.run(prepare_summary, cv)
+        if stored is not None:
+            timer.outcome = "cached"
+            yield stored
+            return
+
+        response = ""
+        with background_limiter:
+            for chunk in registry.get("summary_chain").stream({"cv": cv}):
+                timer.token()
+                response += chunk.content
+                yield chunk.content
+        finish_summary(cv, response)
+
+async def astream_summary(cv: str):
+    with StreamTimer("summary", Trace("summary")) as timer:
+        stored = await asyncio.to_thread(timer.trace.run, prepare_summary, cv)
+        if stored is not None:
+            timer.outcome = "cached"
+            yield stored
+            return
+
+        response = ""
+        async with background_limiter:
+            async for chunk in registry.get("summary_chain").astream({"cv": cv}):
+                timer.token()
+                response += chunk.content
+                yield chunk.content
+        await asyncio.to_thread(finish_summary, cv, response)
+
+def generate_summary(cv: str):
+    key = get_summary_key(cv)
+    try:
+        if summary_store.get(key) is None:
+            with background_limiter:
+                response = registry.get("summary_chain").invoke({"cv": cv})
+            summary_store.set(key, response.content.encode("utf-8"))
+    except Exception as e:
+        print(f"❌ Background summary failed: {e}")
+    finally:
+        with summary_executor_lock:
+            pending_summaries.discard(key)
+
+def pregenerate_summaries(cvs: list[str]) -> int:
+    global summary_executor
+    if not settings.SUMMARY_PREGENERATE:
+        return 0
+
+    queued = 0
+    with summary_executor_lock:
+        if summary_executor is None:
+            summary_executor = ThreadPoolExecutor(max_workers=settings.SUMMARY_WORKERS, thread_name_prefix="summary")
+        for cv in cvs:
+            key = get_summary_key(cv)
+            if key in pending_summaries or summary_store.get(key) is not None:
+                continue
+            pending_summaries.add(key)
+            summary_executor.submit(generate_summary, cv)
+            queued += 1
+
+    if queued:
+        print(f"ℹ️ Queued {queued} summary(ies) for background generation.")
+    return queued
@@ -0,0 +1,34 @@
+import hashlib
+import json
+from pathlib import Path
+from app.utils.cache import DiskCache
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ArtifactStore:
+    def __init__(self, path: Path, version: int):
+        self.cache = DiskCache(path)
+        self.version = version
+
+    def key(self, file_hash: str) -> str:
+        # Bumping the parser version makes every earlier artifact a miss
+        return f"v{self.version}:{file_hash}"
+
+    def get_many(self, file_hashes: list[str]) -> dict[str, dict]:
+        found = self.cache.get_many([self.key(h) for h in file_hashes])
+        artifacts = {}
+        for file_hash in file_hashes:
+            value = found.get(self.key(file_hash))
+            if value is not None:
+                artifacts[file_hash] = json.loads(value)
+        return artifacts
+
+    def put(self, file_hash: str, artifact: dict):
+        artifact = {**artifact, "file_hash": file_hash, "parser_version": self.version}
+        self.cache.set(self.key(file_hash), json.dumps(artifact).encode("utf-8"))
+        return artifact
@@ -1,145 +1,167 @@
-import pandas as pd
 import gradio as gr
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-import os
-import shutil
-from pathlib import Path
-from app.chatbot import stream_answer
-from app.summarizer import stream_summary
-from app.skill_assessor import skill_scoring
-from app.utils.parser import parse_multiple, structure_and_save
-from app.utils.embedding import create_chroma
+import asyncio
+from app.chatbot import astream_answer
+from app.summarizer import astream_summary
+from app.skill_assessor import skill_scoring, rank_candidates, parse_weighted_skills
+from app.utils.text import preprocess
+from app.utils.embedding import create_chroma, index_lock, remove_candidates
+from app.utils.catalog import candidate_catalog
 from app.utils.config import settings
+from app.utils.jobs import ingest_jobs
+from app.utils.pipeline import IngestPipeline
 
-uploaded_files = []
-parsed_files = []
-
-def stream_chat_interface(question, history):
+async def stream_chat_interface(question, history):
     history = history or []
     history.append((question, "..."))
     yield history, history, ""
 
     response = ""
-    for token in stream_answer(question):
+    async for token in astream_answer(question):
         response += token
         history[-1] = (question, response)
         yield history, history, ""
 
-def upload_and_process_files(files):
-    global uploaded_files, parsed_files
-
-    if not files:
-        return "⚠️ No files uploaded."
-
-    uploaded_files = []
-    for f in files:
-        filename = os.path.basename(f.name)
-        file_path = settings.UPLOAD_DIR / filename
-        shutil.copy(f.name, file_path)
-        uploaded_files.append(file_path)
-
-    parsed_files = parse_multiple(uploaded_files)
-    if not parsed_files:
-        return f"❌ Parsing failed."
-
-    return f"🟡 Uploaded {len(uploaded_files)} file(s)."
-
-def store_structured_files():
-    upload_paths = list(settings.UPLOAD_DIR.glob("*"))
-
-    if not upload_paths:
-        return "⚠️ No uploaded files found."
-
-    parsed = parse_multiple(upload_paths)
-
-    if not parsed:
-        return "❌ Parsing failed for uploaded files."
+def ingest_files(job):
+    stats = IngestPipeline(job.files, job).run()
+    counts, names, index = stats["counts"], stats["names"], stats["index"]
+    embedding = stats["embedding"]
+    return (
+        f"✅ {counts['indexed']} CV(s) searchable ({index['added']} chunk(s) added, {index['kept']} kept, {index['removed']} removed). "
+        f"Names: {names['cache']} cached, {names['heuristic']} heuristic, {names['llm']} LLM. "
+        f"Embedding cache: {embedding['hits']} hit(s), {embedding['misses']} miss(es)."
+    )
 
-    structured_paths = structure_and_save(parsed)
+def index_files(job, full_rebuild: bool = False):
+    # create_chroma diffs the whole CV directory against the index, so only one job writes at a time
+    job.update("🟡 Waiting for another index update...")
+    while not index_lock.acquire(timeout=0.5):
+        job.check_cancelled()
+    try:
+        job.check_cancelled()
+        job.update("🟡 Embedding and storing chunks...")
+        _, stats = create_chroma(full_rebuild=full_rebuild)
+    finally:
+        index_lock.release()
+
+    if not (stats["added"] or stats["kept"] or stats["removed"]):
+        return "❌ No documents found to embed."
 
-    if not structured_paths:
-        return "❌ Structuring failed."
+    embedding = stats["embedding"]
+    return (
+        f"✅ Stored {stats['added'] + stats['kept']} Chunk(s) in ChromaDB ({stats['added']} added, {stats['kept']} kept, {stats['removed']} removed). "
+        f"Embedding cache: {embedding['hits']} hit(s), {embedding['misses']} miss(es), {embedding['chunks_per_sec']} chunks/sec."
+    )
 
-    return f"✅ Porcessed {len(structured_paths)} CV(s) from uploaded files."
+def upload_and_process_files(files, request: gr.Request):
+    # One step from upload to searchable: parsing, naming, chunking and indexing overlap per CV
+    if not files:
+        return "⚠️ No files uploaded.", gr.skip()
+
+    job = ingest_jobs.create(request.session_hash, [f.name for f in files])
+    ingest_jobs.run(job, "ingest", ingest_files)
+    return f"🟡 Queued {len(job.files)} file(s)...", gr.Timer(active=True)
+
+def rebuild_vector_db(request: gr.Request):
+    # Chat keeps answering from the current collection until the rebuilt one is switched in
+    job = ingest_jobs.latest(request.session_hash) or ingest_jobs.create(request.session_hash)
+    ingest_jobs.run(job, "rebuild", lambda job: index_files(job, full_rebuild=True))
+    return "🟡 Queued...", gr.Timer(active=True)
+
+def get_ingest_status(request: gr.Request) -> dict:
+    job = ingest_jobs.latest(request.session_hash)
+    return job.status() if job else {}
+
+def describe_ingest_job(job) -> tuple[str, str, str]:
+    counts = job.counts
+    if job.stage == "rebuild" or not counts:
+        return gr.skip(), gr.skip(), job.message
+    icon = "✅" if job.state == "done" else "🟡"
+    return (
+        f"{icon} Parsed {counts['parsed']}/{counts['total']}" + (f", {counts['failed']} failed" if counts["failed"] else ""),
+        f"{icon} Named {counts['named']} CV(s)",
+        job.message if not job.busy else f"🟡 {counts['indexed']} CV(s) searchable"
+    )
 
-def store_to_vector_db():
-    vectorstore = create_chroma()
-    if vectorstore is None:
-        return "❌ No documents found to embed."
+def poll_ingest_job(request: gr.Request):
+    # Fills the status boxes of the running batch and stops the timer once it is idle
+    job = ingest_jobs.latest(request.session_hash)
+    if job is None or job.stage is None:
+        return gr.skip(), gr.skip(), gr.skip(), gr.Timer(active=False)
 
-    return f"✅ Stored {len(vectorstore._collection.get()['documents'])} Chunk(s) in ChromaDB."
+    return *describe_ingest_job(job), gr.Timer(active=job.busy)
 
-def clear_uploads():
-    global uploaded_files, parsed_files
-    uploaded_files = []
-    parsed_files = []
+def cancel_ingest_job(request: gr.Request):
+    job = ingest_jobs.latest(request.session_hash)
+    if job is None or not ingest_jobs.cancel(job):
+        gr.Info("No ingestion job is running.")
 
+def clear_uploads(request: gr.Request):
     upload_removed = 0
-    processed_removed = 0
-
-    for f in settings.UPLOAD_DIR.glob("*"):
-        try:
-            f.unlink()
-            upload_removed += 1
-        except Exception as e:
-            print(f"⚠️ Could not delete {f.name}: {e}")
-
-    for f in settings.CVS_DIR.glob("*"):
-        try:
-            f.unlink()
-            processed_removed += 1
-        except Exception as e:
-            print(f"⚠️ Could not delete {f.name}: {e}")
+
+    # Only this session's batches and the CVs they produced; other recruiters' uploads are left alone.
+    # Batches are stopped and waited for first, so none of them adds or indexes a CV after it was collected.
+    jobs = ingest_jobs.session_jobs(request.session_hash)
+    for job in jobs:
+        upload_removed += len(job.files)
+        ingest_jobs.remove(job)
+    removed_names = []
+    for job in jobs:
+        if not ingest_jobs.wait(job, settings.JOB_STOP_TIMEOUT):
+            print(f"⚠️ Ingest job {job.id} did not stop within {settings.JOB_STOP_TIMEOUT:g}s; clearing what it has produced so far.")
+        removed_names += job.created
+    processed_removed = candidate_catalog.remove(removed_names)
+    remove_candidates(removed_names)
 
     upload_msg = f"🧹 Cleared {upload_removed} uploaded file(s)." if upload_removed else "ℹ️ No uploaded files to clear."
     processed_msg = f"🧹 Cleared {processed_removed} processed CV(s)." if processed_removed else "ℹ️ No processed CVs to clear."
 
     return upload_msg, processed_msg
 
-def get_file_stems() -> list[str]:
-    path = Path(settings.CVS_DIR)
-    if not path.exists() or not path.is_dir():
-        raise ValueError(f"Invalid directory: {settings.CVS_DIR}")
+def discard_session_jobs(request: gr.Request):
+    # The tab was closed: stop its batches and drop their uploads
+    for job in ingest_jobs.session_jobs(request.session_hash):
+        ingest_jobs.remove(job)
 
-    stems = [file.stem for file in path.iterdir() if file.is_file()]
-    return stems
+def list_candidates() -> list[str]:
+    return candidate_catalog.names()
 
 def retrieve_candidate_context(candidate_name: str) -> str:
-    file_path = Path(settings.CVS_DIR) / f"{candidate_name}.txt"
-    if not file_path.exists():
+    text = candidate_catalog.read_text(candidate_name)
+    if text is None:
         raise FileNotFoundError(f"Context file not found for: {candidate_name}")
     
-    return file_path.read_text(encoding="utf-8")
+    return text
 
-def stream_summary_response(candidate_name: str):
+async def stream_summary_response(candidate_name: str):
     # Retrieve full context for the candidate
-    cv_text = retrieve_candidate_context(candidate_name)
+    cv_text = await asyncio.to_thread(retrieve_candidate_context, candidate_name)
 
     yield [(f"Summarizing {candidate_name} CV",'...')]
     response = ''
     # Stream the answer
-    for chunk in stream_summary(cv=cv_text):
+    async for chunk in astream_summary(cv=cv_text):
         response += chunk
         yield [(f'{candidate_name} CV Summary',response)]
 
 def update_choices(skill_input: str):
-    skills = [s.strip() for s in skill_input.split(",") if s.strip()]
-    candidates = get_file_stems()
+    skills = list(parse_weighted_skills(skill_input))
+    candidates = list_candidates()
     return  gr.update(choices=skills, value=skills[0] if skills else None), gr.update(choices=candidates, value=candidates[0] if candidates else None)
 
 def skill_scoring_interface_single_skill(skill_input: str, selected_skill: str):
+    import plotly.express as px
     df = skill_scoring(skill_input)
     
     if df.empty or "Candidate" not in df.columns:
         return px.bar(title="No data available.")
 
-    if selected_skill not in df.columns:
+    # Columns hold the preprocessed skill names
+    column = preprocess(selected_skill or "")
+    if column not in df.columns:
         return px.bar(title=f"No mentions of skill: {selected_skill}")
 
 
-    df_plot = df[["Candidate", selected_skill]].copy()
+    df_plot = df[["Candidate", column]].rename(columns={column: selected_skill})
     df_plot.sort_values(by=selected_skill, ascending=True, inplace=True)
 
     fig = px.bar(
@@ -171,6 +193,8 @@ def skill_scoring_interface_single_skill(skill_input: str, selected_skill: str):
     return fig
 
 def skill_scoring_interface_single_candidate(skill_input: str, selected_candidate: str):
+    import pandas as pd
+    import plotly.express as px
     df = skill_scoring(skill_input)
     
     if df.empty or "Candidate" not in df.columns:
@@ -219,4 +243,41 @@ def skill_scoring_interface_single_candidate(skill_input: str, selected_candidat
     return fig
 
 def update_candidate_choices():
-    return gr.update(choices=get_file_stems(), value=None)
+    return gr.update(choices=list_candidates(), value=None)
+
+def rank_candidates_interface(skill_input: str, top_n: int):
+    import plotly.express as px
+    df = rank_candidates(skill_input, top_n=top_n or 10)
+
+    if df.empty:
+        return df, px.bar(title="No data available.")
+
+    df_plot = df.sort_values(by="Score", ascending=True)
+    skills = [c for c in df.columns if c not in ("Candidate", "Score")]
+
+    fig = px.bar(
+        df_plot,
+        x="Score",
+        y="Candidate",
+        text="Score",
+        orientation="h",
+        hover_data=skills,
+        title="Weighted Skill Score per Candidate",
+    )
+
+    fig.update_traces(
+        marker_color="#4c78a8",
+        textposition="outside"
+    )
+
+    fig.update_layout(
+        height=max(400, 40 * len(df_plot)),
+        plot_bgcolor="#111111",
+        paper_bgcolor="#111111",
+        font=dict(color="white"),
+        xaxis_title="Score",
+        yaxis_title="Candidate",
+        margin=dict(t=60, b=60, l=40, r=40)
+    )
+
+    return df, fig
@@ -0,0 +1,345 @@
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+from app.utils.config import settings
+from app.utils.corpus import RECORD_HEADER, PackedCorpus
+from app.utils.text import hash_text
+
+COLUMNS = (
+    "id", "name", "display_name", "source_file", "source_hash", "source_size",
+    "content_hash", "text_size", "chunk_count", "text_file", "corpus_offset", "corpus_size",
+    "created_at", "updated_at"
+)
+# Added after the first release of the table
+LATER_COLUMNS = {"corpus_offset": "INTEGER", "corpus_size": "INTEGER"}
+BACKENDS = ("files", "packed")
+# Below this much garbage a compaction isn't worth rewriting the corpus for
+COMPACT_MIN_BYTES = 1 << 20
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class CandidateCatalog:
+    # One row per candidate. display_name is unique and is the key the indexes, dropdowns and chat use;
+    # name is what the CV itself says, so two people called the same get "Name" and "Name (2)".
+    # A CV's text is either a .txt in cvs_dir or, with corpus_offset set, a record in the packed corpus file.
+    def __init__(self, path: Path, cvs_dir: Path, backend: str = "files"):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown corpus backend: {backend} (expected one of {', '.join(BACKENDS)})")
+        self.path = Path(path)
+        self.cvs_dir = Path(cvs_dir)
+        self.backend = backend
+        self.corpus = None
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use, so importing this in parser worker processes costs nothing
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS candidates (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    display_name TEXT NOT NULL UNIQUE,
+                    source_file TEXT,
+                    source_hash TEXT,
+                    source_size INTEGER,
+                    content_hash TEXT NOT NULL,
+                    text_size INTEGER NOT NULL,
+                    chunk_count INTEGER,
+                    text_file TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(candidates)")}
+            for column, column_type in LATER_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE candidates ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS candidates_name ON candidates (name)")
+            conn.execute("CREATE INDEX IF NOT EXISTS candidates_content_hash ON candidates (content_hash)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.commit()
+            self._conn = conn
+            self._open_corpus()
+            if not conn.execute("SELECT 1 FROM candidates LIMIT 1").fetchone():
+                self._import_directory()
+            if self.backend == "packed" and conn.execute("SELECT 1 FROM candidates WHERE corpus_offset IS NULL LIMIT 1").fetchone():
+                # Switching to the packed backend moves the existing .txt files into the corpus once
+                self._compact()
+        return self._conn
+
+    def _corpus_path(self, generation: int) -> Path:
+        return self.path.parent / f"corpus_v{generation}.bin"
+
+    def _open_corpus(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'corpus_generation'").fetchone()
+        generation = int(row[0]) if row else 0
+        self.corpus = PackedCorpus(self._corpus_path(generation))
+        # Left behind by a compaction that stopped before it was committed
+        for path in self.path.parent.glob("corpus_v*.bin"):
+            if path != self.corpus.path:
+                path.unlink(missing_ok=True)
+
+    def _import_directory(self):
+        # CVs saved before the catalog existed are picked up once, with their file stem as the name
+        for file in sorted(self.cvs_dir.glob("*.txt")):
+            try:
+                text = file.read_text(encoding="utf-8").strip()
+            except Exception as e:
+                print(f"❌ Failed to read {file.name}: {e}")
+                continue
+            self._insert(file.stem, file.stem, text, file.name, {})
+        self._conn.commit()
+
+    def _insert(self, name: str, display_name: str, text: str, text_file: str, source: dict) -> dict:
+        timestamp = now()
+        record = {
+            "id": uuid.uuid4().hex[:12],
+            "name": name,
+            "display_name": display_name,
+            "source_file": source.get("source_file"),
+            "source_hash": source.get("source_hash"),
+            "source_size": source.get("source_size"),
+            "content_hash": hash_text(text),
+            "text_size": len(text),
+            "chunk_count": None,
+            "text_file": text_file,
+            "corpus_offset": None,
+            "corpus_size": None,
+            "created_at": timestamp,
+            "updated_at": timestamp
+        }
+        self._conn.execute(
+            f"INSERT INTO candidates ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            [record[column] for column in COLUMNS]
+        )
+        return record
+
+    def _find(self, sql: str, params: tuple) -> dict | None:
+        row = self._conn.execute(f"SELECT * FROM candidates WHERE {sql} LIMIT 1", params).fetchone()
+        return dict(row) if row else None
+
+    def _free_display_name(self, name: str) -> str:
+        display_name, n = name, 1
+        while self._find("display_name = ?", (display_name,)):
+            n += 1
+            display_name = f"{name} ({n})"
+        return display_name
+
+    def _store_text(self, record: dict, text: str) -> Path | None:
+        # Called with the lock held; the row is updated by the caller's commit. Returns a .txt the text
+        # moved out of, which the caller deletes once the commit has made the corpus copy the live one.
+        stale_file = None
+        if self.backend == "packed":
+            offset, size = self.corpus.append(text)
+            if record["corpus_offset"] is None:
+                stale_file = self.text_path(record)
+            record.update({"corpus_offset": offset, "corpus_size": size})
+        else:
+            self.cvs_dir.mkdir(parents=True, exist_ok=True)
+            self.text_path(record).write_text(text, encoding="utf-8")
+            record.update({"corpus_offset": None, "corpus_size": None})
+        self._conn.execute(
+            "UPDATE candidates SET corpus_offset = ?, corpus_size = ? WHERE id = ?",
+            (record["corpus_offset"], record["corpus_size"], record["id"])
+        )
+        return stale_file
+
+    def _read_text(self, record: dict) -> str:
+        if record["corpus_offset"] is not None:
+            return self.corpus.read(record["corpus_offset"], record["corpus_size"])
+        return self.text_path(record).read_text(encoding="utf-8").strip()
+
+    def register(self, name: str, text: str, source_file: str = None, source_hash: str = None, source_size: int = None) -> tuple[dict, bool]:
+        # The same text again is the same candidate; the same name from the same source file is an updated CV.
+        # Anyone else with that name gets their own entry instead of overwriting the first.
+        # Also returns whether the entry is new, so a batch only ever clears the candidates it added.
+        text = text.strip()
+        content_hash = hash_text(text)
+        source = {"source_file": source_file, "source_hash": source_hash, "source_size": source_size}
+        with self._lock:
+            self._connect()
+            record = self._find("content_hash = ?", (content_hash,))
+            if record is None:
+                # Imported CVs have no source file, so the first upload under their name takes them over
+                record = self._find("name = ? AND (source_file = ? OR source_file IS NULL)", (name, source_file))
+            if record is None:
+                display_name = self._free_display_name(name)
+                record = self._insert(name, display_name, text, f"{display_name}.txt", source)
+                created = changed = True
+            else:
+                created = False
+                record.update({key: value for key, value in source.items() if value is not None})
+                changed = record["content_hash"] != content_hash
+                record.update({"content_hash": content_hash, "text_size": len(text), "updated_at": now()})
+                if changed:
+                    record["chunk_count"] = None
+                self._conn.execute(
+                    "UPDATE candidates SET source_file = ?, source_hash = ?, source_size = ?, content_hash = ?, "
+                    "text_size = ?, chunk_count = ?, updated_at = ? WHERE id = ?",
+                    (record["source_file"], record["source_hash"], record["source_size"], content_hash,
+                     len(text), record["chunk_count"], record["updated_at"], record["id"])
+                )
+            # An unchanged text is only written again if it isn't stored where the current backend keeps it
+            stale_file = None
+            if changed or (record["corpus_offset"] is None) == (self.backend == "packed"):
+                stale_file = self._store_text(record, text)
+            self._conn.commit()
+            if stale_file is not None:
+                stale_file.unlink(missing_ok=True)
+        return record, created
+
+    def get(self, display_name: str) -> dict | None:
+        with self._lock:
+            self._connect()
+            return self._find("display_name = ?", (display_name,))
+
+    def records(self) -> list[dict]:
+        with self._lock:
+            rows = self._connect().execute("SELECT * FROM candidates ORDER BY display_name").fetchall()
+        return [dict(row) for row in rows]
+
+    def names(self) -> list[str]:
+        with self._lock:
+            rows = self._connect().execute("SELECT display_name FROM candidates ORDER BY display_name").fetchall()
+        return [row[0] for row in rows]
+
+    def hashes(self) -> dict[str, str]:
+        with self._lock:
+            rows = self._connect().execute("SELECT display_name, content_hash FROM candidates").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def text_path(self, record: dict) -> Path:
+        return self.cvs_dir / record["text_file"]
+
+    def read_text(self, display_name: str) -> str | None:
+        # Looked up and read under one lock, so a compaction can't move the record in between
+        with self._lock:
+            self._connect()
+            record = self._find("display_name = ?", (display_name,))
+            if record is None:
+                return None
+            try:
+                return self._read_text(record)
+            except FileNotFoundError:
+                return None
+
+    def iter_texts(self, display_names: list[str] = None, page_size: int = 500) -> Iterator[tuple[str, str]]:
+        # Walks the corpus in storage order, one page of texts in memory at a time
+        with self._lock:
+            conn = self._connect()
+            if display_names is None:
+                rows = conn.execute("SELECT id, corpus_offset, display_name FROM candidates").fetchall()
+            else:
+                names = list(dict.fromkeys(display_names))
+                rows = []
+                for start in range(0, len(names), page_size):
+                    batch = names[start:start + page_size]
+                    placeholders = ",".join("?" * len(batch))
+                    rows += conn.execute(f"SELECT id, corpus_offset, display_name FROM candidates WHERE display_name IN ({placeholders})", batch).fetchall()
+        ids = [row[0] for row in sorted(rows, key=lambda row: (row[1] is not None, row[1] or 0, row[2]))]
+
+        for start in range(0, len(ids), page_size):
+            batch = ids[start:start + page_size]
+            texts = []
+            with self._lock:
+                placeholders = ",".join("?" * len(batch))
+                records = {row["id"]: dict(row) for row in self._conn.execute(f"SELECT * FROM candidates WHERE id IN ({placeholders})", batch)}
+                # Rows removed since the ids were listed are skipped
+                for record_id in batch:
+                    record = records.get(record_id)
+                    if record is None:
+                        continue
+                    try:
+                        texts.append((record["display_name"], self._read_text(record)))
+                    except Exception as e:
+                        print(f"❌ Failed to read {record['display_name']}: {e}")
+            yield from texts
+
+    def set_chunk_counts(self, counts: dict[str, int]):
+        if not counts:
+            return
+        with self._lock:
+            self._connect().executemany(
+                "UPDATE candidates SET chunk_count = ? WHERE display_name = ?",
+                [(count, display_name) for display_name, count in counts.items()]
+            )
+            self._conn.commit()
+
+    def remove(self, display_names: list[str]) -> int:
+        removed = 0
+        with self._lock:
+            self._connect()
+            for display_name in dict.fromkeys(display_names):
+                record = self._find("display_name = ?", (display_name,))
+                if record is None:
+                    continue
+                self._conn.execute("DELETE FROM candidates WHERE id = ?", (record["id"],))
+                if record["corpus_offset"] is None:
+                    try:
+                        self.text_path(record).unlink(missing_ok=True)
+                    except Exception as e:
+                        print(f"⚠️ Could not delete {record['text_file']}: {e}")
+                removed += 1
+            self._conn.commit()
+            if removed and self._dead_bytes() > max(self.corpus.size() // 2, COMPACT_MIN_BYTES):
+                self._compact()
+        return removed
+
+    def _dead_bytes(self) -> int:
+        # Removed and replaced texts stay in the append-only corpus until it is rewritten
+        live = self._conn.execute(f"SELECT COALESCE(SUM(corpus_size + {RECORD_HEADER.size}), 0) FROM candidates WHERE corpus_offset IS NOT NULL").fetchone()[0]
+        return self.corpus.size() - live
+
+    def compact(self):
+        with self._lock:
+            self._connect()
+            self._compact()
+
+    def _compact(self):
+        # Writes every live text into a new corpus generation in storage order. The offsets and the generation
+        # switch in one commit, so a crash part way leaves the old corpus in use and the new file is discarded.
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'corpus_generation'").fetchone()
+        generation = (int(row[0]) if row else 0) + 1
+        target = PackedCorpus(self._corpus_path(generation))
+        target.path.unlink(missing_ok=True)
+        rows = self._conn.execute("SELECT * FROM candidates ORDER BY corpus_offset IS NULL, corpus_offset, display_name").fetchall()
+
+        moves, loose_files = [], []
+        try:
+            for row in rows:
+                record = dict(row)
+                try:
+                    text = self._read_text(record)
+                except Exception as e:
+                    print(f"❌ Failed to read {record['display_name']}: {e}")
+                    continue
+                if self.backend == "packed" or record["corpus_offset"] is not None:
+                    offset, size = target.append(text)
+                    moves.append((offset, size, record["id"]))
+                    if record["corpus_offset"] is None:
+                        loose_files.append(self.text_path(record))
+        finally:
+            target.close()
+
+        self._conn.executemany("UPDATE candidates SET corpus_offset = ?, corpus_size = ? WHERE id = ?", moves)
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('corpus_generation', ?)", (str(generation),))
+        self._conn.commit()
+
+        previous = self.corpus
+        self.corpus = target
+        previous.close()
+        previous.path.unlink(missing_ok=True)
+        for path in loose_files:
+            path.unlink(missing_ok=True)
+        print(f"🧹 Compacted the CV corpus: {len(moves)} text(s), {target.size()} byte(s).")
+
+candidate_catalog = CandidateCatalog(settings.DATA_DIR / "candidates.sqlite", settings.CVS_DIR, settings.CORPUS_BACKEND)
@@ -0,0 +1,80 @@
+import re
+from collections import deque
+from typing import Iterable, Iterator
+from langchain_core.documents import Document
+
+WORD = re.compile(r"\S+")
+
+# CV text is whitespace-collapsed by the parser, so section starts are found by their headings rather than blank lines
+SECTION_HEADING = re.compile(
+    r"(?:(?:work|professional|relevant|technical|academic)\s+)?"
+    r"(?:experience|employment|education|skills|projects|certifications?|courses|languages|summary|profile|"
+    r"objective|achievements|awards|publications|volunteering|interests|references)\b:?",
+    re.IGNORECASE
+)
+
+# Same ratio as context_builder.estimate_tokens: roughly 4 tokens per 3 English words
+TOKENS_PER_WORD = 4 / 3
+
+def is_section_start(text: str, start: int, previous_end: int) -> bool:
+    if "\n\n" in text[previous_end:start]:
+        return True
+    match = SECTION_HEADING.match(text, start)
+    # Only capitalised headings count; "experience" mid-sentence is not a section
+    return match is not None and text[start].isupper()
+
+def iter_chunk_spans(text: str, chunk_size: int = 50, overlap: int = 10, unit: str = "words", section_aware: bool = True) -> Iterator[tuple[int, int, int]]:
+    # Yields (start, end, token_count) character spans; only a chunk-sized window of word offsets is held at once
+    assert 0 <= overlap < chunk_size, "overlap must be non-negative and smaller than chunk_size"
+    assert unit in ("words", "tokens"), "unit must be 'words' or 'tokens'"
+    word_cost = TOKENS_PER_WORD if unit == "tokens" else 1
+
+    def token_count(words: int) -> int:
+        return (words * 4 + 2) // 3
+
+    window = deque()
+    fresh = 0
+    # The last full chunk is held back as (start, end, word count) in case the tail gets folded into it
+    pending = None
+    previous_end = 0
+    # Whether the current window starts a section, in which case it is never folded back into the previous one
+    section_cut = False
+
+    for match in WORD.finditer(text):
+        start, end = match.span()
+        boundary = section_aware and window and fresh * word_cost >= chunk_size // 2 and is_section_start(text, start, previous_end)
+        if len(window) * word_cost + word_cost > chunk_size or boundary:
+            if fresh:
+                if pending is not None:
+                    yield pending[0], pending[1], token_count(pending[2])
+                pending = (window[0][0], window[-1][1], len(window))
+            # Overlap repeats the end of the previous chunk, but never carries one section into the next
+            if boundary:
+                window.clear()
+            section_cut = bool(boundary)
+            while window and len(window) * word_cost > overlap:
+                window.popleft()
+            fresh = 0
+        window.append((start, end))
+        fresh += 1
+        previous_end = end
+
+    if fresh:
+        # A short tail is folded into the previous chunk instead of becoming a fragment of its own,
+        # unless that would undo a section cut
+        if pending is not None and not section_cut and len(window) * word_cost < chunk_size // 2:
+            pending = (pending[0], window[-1][1], pending[2] + fresh)
+        else:
+            if pending is not None:
+                yield pending[0], pending[1], token_count(pending[2])
+            pending = (window[0][0], window[-1][1], len(window))
+    if pending is not None:
+        yield pending[0], pending[1], token_count(pending[2])
+
+def iter_chunks(texts: Iterable[str], metadatas: Iterable[dict], **options) -> Iterator[Document]:
+    for text, metadata in zip(texts, metadatas):
+        for index, (start, end, tokens) in enumerate(iter_chunk_spans(text, **options)):
+            yield Document(
+                page_content=text[start:end],
+                metadata={**metadata, "chunk_index": index, "start_offset": start, "end_offset": end, "token_count": tokens}
+            )
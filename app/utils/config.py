@@ -8,15 +8,84 @@ class Settings:
     def __init__(self):
         self.LLM_MODEL = os.getenv("LLM_MODEL", "llama3.1")
         self.EMBEDDING_MODEL= os.getenv("EMBEDDING_MODEL")
+        self.OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")
+        self.OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", 4))
+        # Slots of that cap only chat may use, so summaries and ingestion can't keep a question waiting
+        self.OLLAMA_CHAT_RESERVED = min(int(os.getenv("OLLAMA_CHAT_RESERVED", 1)), self.OLLAMA_MAX_CONCURRENCY - 1)
+
+        self.QUEUE_MAX_SIZE = int(os.getenv("QUEUE_MAX_SIZE", 64))
+        self.CHAT_CONCURRENCY = int(os.getenv("CHAT_CONCURRENCY", 16))
+        self.SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", 4))
+        self.SKILL_CONCURRENCY = int(os.getenv("SKILL_CONCURRENCY", 8))
+        # Every event without a limit of its own: uploads, clearing, rebuilds, cancelling, tab selection
+        self.DEFAULT_CONCURRENCY = int(os.getenv("DEFAULT_CONCURRENCY", 4))
+        # Upload batches are ingested as background jobs; each batch runs its stages in order on one worker
+        self.INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+        self.JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", 3600))
+        # How long Clear All waits for a running batch to stop (it finishes the CV it is on first)
+        self.JOB_STOP_TIMEOUT = float(os.getenv("JOB_STOP_TIMEOUT", 60))
+        # Items buffered between ingestion stages, and how often newly indexed CVs are made visible to chat
+        self.PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 32))
+        self.PIPELINE_PUBLISH_SECONDS = float(os.getenv("PIPELINE_PUBLISH_SECONDS", 2))
+
+        self.EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 32))
+        self.EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", 4))
+        self.INDEX_KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", 2))
+
+        # Chunk sizes are counted in CHUNK_UNIT ("words" or "tokens"); changing them only affects CVs (re)indexed afterwards
+        self.CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 50))
+        self.CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 10))
+        self.CHUNK_UNIT = os.getenv("CHUNK_UNIT", "words")
+        self.CHUNK_SECTION_AWARE = os.getenv("CHUNK_SECTION_AWARE", "true").lower() in ("1", "true", "yes")
+
+        self.PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", os.cpu_count() or 1))
+        self.PARSE_TIMEOUT = float(os.getenv("PARSE_TIMEOUT", 60))
+
+        self.NAME_HEAD_CHARS = int(os.getenv("NAME_HEAD_CHARS", 500))
+        self.NAME_CONCURRENCY = int(os.getenv("NAME_CONCURRENCY", 4))
+
+        # JSON of {"canonical skill": ["alias", ...]} merged into the built-in synonyms (e.g. "k8s" for Kubernetes)
+        self.SKILL_SYNONYMS_FILE = os.getenv("SKILL_SYNONYMS_FILE")
+        self.SKILL_CACHE_SIZE = int(os.getenv("SKILL_CACHE_SIZE", 32))
+
+        self.ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", 256))
+        self.QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 1024))
+
+        self.RETRIEVER_K = int(os.getenv("RETRIEVER_K", 8))
+        self.RETRIEVER_FETCH_K = int(os.getenv("RETRIEVER_FETCH_K", 20))
+        self.CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
+        self.CONTEXT_CANDIDATE_QUOTA = int(os.getenv("CONTEXT_CANDIDATE_QUOTA", 600))
+        self.SMALL_CV_TOKENS = int(os.getenv("SMALL_CV_TOKENS", 800))
+
+        self.SUMMARY_PREGENERATE = os.getenv("SUMMARY_PREGENERATE", "false").lower() in ("1", "true", "yes")
+        self.SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", 1))
+
+        self.METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+        self.METRICS_PORT = int(os.getenv("METRICS_PORT", 9464))
+        self.TRACE_REQUESTS = os.getenv("TRACE_REQUESTS", "false").lower() in ("1", "true", "yes")
+
+        self.LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+        self.LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+        self.LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+        self.LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 1.0))
+        self.LOG_MAX_CONTEXT_CHARS = int(os.getenv("LOG_MAX_CONTEXT_CHARS", 4000))
+        self.DEBUG_CHUNK_LOG = os.getenv("DEBUG_CHUNK_LOG", "false").lower() in ("1", "true", "yes")
         
-        self.UPLOAD_DIR = Path("data/uploads")
-        self.CVS_DIR = Path("data/txt_cvs")
-        self.LOG_DIR = Path("data/logs")
-        self.DB_DIR = Path("data/vector_db")
+        # Where CV texts live: "files" keeps one .txt per CV in CVS_DIR, "packed" appends them all to one
+        # compressed, memory-mapped file under DATA_DIR, which scales to far more candidates
+        self.CORPUS_BACKEND = os.getenv("CORPUS_BACKEND", "files").lower()
+
+        self.DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
+        self.UPLOAD_DIR = self.DATA_DIR / "uploads"
+        self.CVS_DIR = self.DATA_DIR / "txt_cvs"
+        self.LOG_DIR = self.DATA_DIR / "logs"
+        self.DB_DIR = self.DATA_DIR / "vector_db"
+        self.CACHE_DIR = self.DATA_DIR / "cache"
         
         self.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
         self.CVS_DIR.mkdir(parents=True, exist_ok=True)
         self.LOG_DIR.mkdir(parents=True, exist_ok=True)
         self.DB_DIR.mkdir(parents=True, exist_ok=True)
+        self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 settings = Settings()
@@ -0,0 +1,89 @@
+from langchain_core.documents import Document
+
+def estimate_tokens(text: str) -> int:
+    # Llama-family tokenizers average roughly 4 tokens per 3 English words
+    return (len(text.split()) * 4 + 2) // 3
+
+def word_overlap(previous: list[str], current: list[str], max_overlap: int = 100) -> int:
+    for size in range(min(len(previous), len(current), max_overlap), 0, -1):
+        if previous[-size:] == current[:size]:
+            return size
+    return 0
+
+def merge_candidate_chunks(chunks: list[tuple[int, Document]]) -> list[dict]:
+    # chunks are (retrieval rank, doc); neighbours from the same CV version are stitched together
+    def position(item):
+        metadata = item[1].metadata
+        return metadata.get("content_hash", ""), metadata.get("chunk_index", 0)
+
+    passages = []
+    for rank, doc in sorted(chunks, key=position):
+        words = doc.page_content.split()
+        metadata = doc.metadata
+        previous = passages[-1] if passages else None
+        if (
+            previous is not None
+            and previous["content_hash"] == metadata.get("content_hash", "")
+            and metadata.get("chunk_index", 0) - previous["last_index"] <= 1
+        ):
+            start = metadata.get("start_offset")
+            if start is not None and previous["end"] is not None:
+                # Chunks are exact slices of the CV, so the overlap is known from the offsets alone
+                previous["words"].extend(doc.page_content[max(previous["end"] - start, 0):].split())
+            else:
+                previous["words"].extend(words[word_overlap(previous["words"], words):])
+            previous["end"] = metadata.get("end_offset")
+            previous["last_index"] = metadata.get("chunk_index", 0)
+            previous["rank"] = min(previous["rank"], rank)
+            continue
+        passages.append({
+            "content_hash": metadata.get("content_hash", ""),
+            "last_index": metadata.get("chunk_index", 0),
+            "end": metadata.get("end_offset"),
+            "words": words,
+            "rank": rank
+        })
+    return passages
+
+def build_context(docs: list[Document], token_budget: int, candidate_quota: int, min_tokens: int = 20) -> str:
+    by_candidate = {}
+    seen = set()
+    for rank, doc in enumerate(docs):
+        if doc.page_content in seen:
+            continue
+        seen.add(doc.page_content)
+        by_candidate.setdefault(doc.metadata.get("candidate_name", "unknown"), []).append((rank, doc))
+
+    passages = []
+    for candidate, chunks in by_candidate.items():
+        for order, passage in enumerate(merge_candidate_chunks(chunks)):
+            passages.append({**passage, "candidate": candidate, "order": order})
+
+    # Spend the budget on the best-ranked passages first; the tail of a passage is cut rather than dropping it outright
+    used_total = 0
+    used_by_candidate = {}
+    selected = []
+    for passage in sorted(passages, key=lambda p: p["rank"]):
+        used = used_by_candidate.get(passage["candidate"], 0)
+        available = min(token_budget - used_total, candidate_quota - used)
+        tokens = estimate_tokens(" ".join(passage["words"]))
+        if tokens > available:
+            if available < min_tokens:
+                continue
+            passage["words"] = passage["words"][:available * 3 // 4]
+            tokens = estimate_tokens(" ".join(passage["words"]))
+        used_total += tokens
+        used_by_candidate[passage["candidate"]] = used + tokens
+        selected.append(passage)
+
+    # Candidates appear in order of their best chunk, passages in CV order
+    candidate_rank = {}
+    for passage in selected:
+        candidate_rank[passage["candidate"]] = min(candidate_rank.get(passage["candidate"], passage["rank"]), passage["rank"])
+
+    blocks = []
+    for candidate in sorted(candidate_rank, key=candidate_rank.get):
+        texts = [" ".join(p["words"]) for p in sorted(selected, key=lambda p: p["order"]) if p["candidate"] == candidate]
+        blocks.append(f"------The following chunk belongs to {candidate}------\n" + "\n".join(texts) + "\n")
+
+    return "\n" + "\n\n".join(blocks) + "\n" if blocks else ""
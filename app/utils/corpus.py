@@ -0,0 +1,59 @@
+import mmap
+import struct
+import zlib
+from pathlib import Path
+
+# Each record is a 4-byte little-endian length followed by the zlib-compressed UTF-8 text
+RECORD_HEADER = struct.Struct("<I")
+COMPRESSION_LEVEL = 6
+
+class PackedCorpus:
+    # Every CV text in one append-only file. The catalog keeps each record's offset and size, so a CV is one
+    # slice of a shared read-only memory map away and nothing is read until it is asked for.
+    # Not thread-safe on its own: the catalog serialises access under its lock.
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._writer = None
+        self._map = None
+
+    def append(self, text: str) -> tuple[int, int]:
+        # Returns (offset, size) of the compressed payload; replaced texts stay behind until the file is compacted
+        data = zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = open(self.path, "ab")
+        offset = self._writer.tell() + RECORD_HEADER.size
+        self._writer.write(RECORD_HEADER.pack(len(data)) + data)
+        self._writer.flush()
+        return offset, len(data)
+
+    def read(self, offset: int, size: int) -> str:
+        if self._map is None or offset + size > len(self._map):
+            # The file grew since it was mapped
+            self._remap()
+        if offset + size > len(self._map):
+            raise ValueError(f"record at {offset} runs past the end of {self.path.name}")
+        return zlib.decompress(self._map[offset:offset + size]).decode("utf-8")
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        with open(self.path, "rb") as f:
+            if f.seek(0, 2) == 0:
+                raise ValueError(f"{self.path.name} is empty")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
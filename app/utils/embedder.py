@@ -0,0 +1,77 @@
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.embeddings import Embeddings
+from app.utils.cache import DiskCache
+from app.utils.limiter import ollama_limiter, background_limiter
+from app.utils.metrics import span
+from app.utils.text import hash_text
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: DiskCache, batch_size: int = 32, max_concurrency: int = 4):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"hits": 0, "misses": 0, "chunks": 0, "seconds": 0.0}
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["chunks_per_sec"] = round(stats["chunks"] / stats["seconds"], 2) if stats["seconds"] else 0.0
+        return stats
+
+    def cache_key(self, text: str) -> str:
+        return f"{self.model_name}:{hash_text(text)}"
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        start = time.perf_counter()
+        keys = [self.cache_key(text) for text in texts]
+        vectors = {key: decode_vector(value) for key, value in self.cache.get_many(keys).items()}
+
+        # Identical chunks (e.g. a CV uploaded twice) are only embedded once
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        missing_keys = list(missing)
+        batches = [missing_keys[i:i + self.batch_size] for i in range(0, len(missing_keys), self.batch_size)]
+
+        def embed_batch(batch_keys: list[str]) -> dict[str, list[float]]:
+            with background_limiter, span("embed_batch"):
+                embedded = dict(zip(batch_keys, self.embeddings.embed_documents([missing[key] for key in batch_keys])))
+            # Persist per batch so an interrupted run keeps everything embedded so far
+            self.cache.set_many({key: encode_vector(vector) for key, vector in embedded.items()})
+            return embedded
+
+        if len(batches) == 1:
+            vectors.update(embed_batch(batches[0]))
+        elif batches:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                for embedded in executor.map(embed_batch, batches):
+                    vectors.update(embedded)
+
+        hits = sum(1 for key in keys if key not in missing)
+        with self._lock:
+            self.stats["hits"] += hits
+            self.stats["misses"] += len(keys) - hits
+            self.stats["chunks"] += len(keys)
+            self.stats["seconds"] += time.perf_counter() - start
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        with ollama_limiter:
+            return self.embeddings.embed_query(text)
+
+def encode_vector(vector: list[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+def decode_vector(value: bytes) -> list[float]:
+    return array("f", value).tolist()
@@ -1,12 +1,49 @@
-from langchain_community.vectorstores import Chroma
-from langchain_community.document_loaders import TextLoader
 from langchain_core.documents import Document
-from langchain_ollama import OllamaEmbeddings
+from app.utils.cache import DiskCache
+from app.utils.catalog import candidate_catalog
+from app.utils.chunker import iter_chunks
 from app.utils.config import settings
+from app.utils.embedder import CachedEmbeddings
+from app.utils.lexical_index import BM25Index
 from app.utils.logger import log_chunks_to_file
+from app.utils.metrics import span
+from app.utils.registry import registry
+from app.utils.text import hash_text
 from pathlib import Path
+from typing import Iterable, Iterator
+import json
+import os
+import threading
+import uuid
 
-embedding_model = OllamaEmbeddings(model=settings.EMBEDDING_MODEL)
+def create_embedding_model() -> CachedEmbeddings:
+    from langchain_ollama import OllamaEmbeddings
+    return CachedEmbeddings(
+        OllamaEmbeddings(model=settings.EMBEDDING_MODEL, base_url=settings.OLLAMA_BASE_URL),
+        model_name=settings.EMBEDDING_MODEL,
+        cache=DiskCache(settings.CACHE_DIR / "embeddings.sqlite"),
+        batch_size=settings.EMBED_BATCH_SIZE,
+        max_concurrency=settings.EMBED_CONCURRENCY
+    )
+
+registry.register("embedding_model", create_embedding_model)
+
+def get_embedding_model() -> CachedEmbeddings:
+    return registry.get("embedding_model")
+
+def get_lexical_index_path(collection: str) -> Path:
+    if collection == LEGACY_COLLECTION:
+        return settings.DB_DIR / "bm25_index.joblib"
+    return settings.DB_DIR / f"bm25_{collection}.joblib"
+
+def get_lexical_index(collection: str = None) -> BM25Index:
+    collection = collection or get_active_index()["collection"]
+    return registry.get(f"lexical_index:{collection}", lambda: BM25Index(get_lexical_index_path(collection)))
+
+def get_vectorstore(collection: str = None):
+    # Resolved on every call so readers follow the active collection as soon as a rebuild swaps it in
+    collection = collection or get_active_index()["collection"]
+    return registry.get(f"vectorstore:{collection}", lambda: load_chroma(collection))
 
 def chunk_by_blank_lines(texts: list[str], metadatas: list[dict]) -> list[Document]:
     documents = []
@@ -19,86 +56,283 @@ def chunk_by_blank_lines(texts: list[str], metadatas: list[dict]) -> list[Docume
 
     return documents
 
-def chunk_cvs(texts: list[str], metadatas: list[dict], chunk_size: int = 50, overlap: int = 10) -> list[Document]:
+def chunk_cvs(texts: list[str], metadatas: list[dict], chunk_size: int = None, overlap: int = None) -> list[Document]:
     assert len(texts) == len(metadatas), "texts and metadatas must have the same length"
-    assert 0 <= overlap < chunk_size, "overlap must be non-negative and smaller than chunk_size"
-
-    def split_into_chunks(text: str) -> list[str]:
-        words = text.split()
-        chunks = []
-        start = 0
-        while start < len(words):
-            end = start + chunk_size
-            if len(words) - start < chunk_size // 2 and chunks:
-                chunks[-1].extend(words[start:])
-                break
-            chunk = words[start:end]
-            chunks.append(chunk)
-            if end >= len(words): break
-            start += chunk_size - overlap
-        return [' '.join(chunk) for chunk in chunks]
-
-    all_docs = []
-    for text, metadata in zip(texts, metadatas):
-        for chunk in split_into_chunks(text):
-            print(metadata)
-            all_docs.append(Document(page_content=chunk, metadata=metadata))
-    
-    return all_docs
+    return list(iter_cv_chunks(texts, metadatas, chunk_size, overlap))
+
+def iter_cv_chunks(texts: Iterable[str], metadatas: Iterable[dict], chunk_size: int = None, overlap: int = None) -> Iterator[Document]:
+    return iter_chunks(
+        texts,
+        metadatas,
+        chunk_size=chunk_size or settings.CHUNK_SIZE,
+        overlap=settings.CHUNK_OVERLAP if overlap is None else overlap,
+        unit=settings.CHUNK_UNIT,
+        section_aware=settings.CHUNK_SECTION_AWARE
+    )
+
+def iter_cv_texts() -> Iterator[tuple[str, str]]:
+    return candidate_catalog.iter_texts()
+
+def read_cv_texts() -> dict[str, str]:
+    return dict(iter_cv_texts())
+
+def iter_cv_documents() -> Iterator[Document]:
+    # One CV's text is held at a time, however large the corpus
+    for name, text in iter_cv_texts():
+        yield from iter_cv_chunks([text], [{"candidate_name": name}])
 
 def get_cv_documents():
-    texts = []
-    metadatas = []
-
-    for file in settings.CVS_DIR.glob("*.txt"):
-        try:
-            with open(file, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                texts.append(content)
-                metadatas.append({'candidate_name':Path(file.name).stem})
-        except Exception as e:
-            print(f"❌ Failed to read {file.name}: {e}")
-
-    docs = chunk_cvs(texts, metadatas)
+    docs = list(iter_cv_documents())
     log_chunks_to_file(docs)
     return docs
 
-def create_chroma():
+ACTIVE_INDEX_FILE = settings.DB_DIR / "active_index.json"
+# Written into the pointer, so readers can tell a version published by this process from another process's
+WRITER_ID = uuid.uuid4().hex
+COLLECTION_PREFIX = "cvs_v"
+# Stores created before versioned collections used langchain's default collection
+LEGACY_COLLECTION = "langchain"
+
+def get_active_index() -> dict:
     try:
-        vectorstore = Chroma(
-            embedding_function=embedding_model,
-            persist_directory=str(settings.DB_DIR)
+        return json.loads(ACTIVE_INDEX_FILE.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {"collection": LEGACY_COLLECTION, "generation": 0, "version": "", "embedding_model": None, "writer": None}
+
+def set_active_index(collection: str, generation: int) -> dict:
+    # The pointer is replaced in one rename, so readers see either the old or the new collection, never a mix
+    active = {
+        "collection": collection,
+        "generation": generation,
+        "version": uuid.uuid4().hex,
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "writer": WRITER_ID
+    }
+    tmp_path = ACTIVE_INDEX_FILE.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(active), encoding="utf-8")
+    os.replace(tmp_path, ACTIVE_INDEX_FILE)
+    return active
+
+def get_index_version() -> str:
+    return get_active_index()["version"]
+
+def get_generation(collection: str) -> int | None:
+    suffix = collection[len(COLLECTION_PREFIX):]
+    if collection.startswith(COLLECTION_PREFIX) and suffix.isdigit():
+        return int(suffix)
+    return 0 if collection == LEGACY_COLLECTION else None
+
+def collect_old_collections(keep: int = None) -> list[str]:
+    keep = keep or settings.INDEX_KEEP_VERSIONS
+    active = get_active_index()
+    client = get_vectorstore(active["collection"])._client
+
+    # Generations above the active one belong to a rebuild that is still running
+    finished = sorted(
+        (generation, collection.name) for collection in client.list_collections()
+        if (generation := get_generation(collection.name)) is not None and generation <= active["generation"]
+    )
+    # The previous versions stay around so queries that resolved them before the swap can finish
+    kept = {name for _, name in finished[-keep:]} | {active["collection"]}
+
+    removed = []
+    for _, name in finished:
+        if name in kept:
+            continue
+        client.delete_collection(name)
+        get_lexical_index_path(name).unlink(missing_ok=True)
+        registry.reset(f"vectorstore:{name}")
+        registry.reset(f"lexical_index:{name}")
+        removed.append(name)
+
+    if removed:
+        print(f"🧹 Removed old index version(s): {', '.join(removed)}.")
+    return removed
+
+def get_chunk_id(candidate_name: str, content_hash: str, chunk_index: int) -> str:
+    return f"{candidate_name}:{content_hash[:16]}:{chunk_index}"
+
+def get_chunk_candidate(chunk_id: str) -> str:
+    return chunk_id.rsplit(":", 2)[0]
+
+def get_index_state(vectorstore, candidate_names: list[str] = None) -> dict:
+    # candidate_name -> content_hash -> ids of the chunks stored for that version of the CV
+    where = {"candidate_name": {"$in": candidate_names}} if candidate_names is not None else None
+    records = vectorstore._collection.get(where=where, include=["metadatas"])
+    state = {}
+    for record_id, metadata in zip(records["ids"], records["metadatas"]):
+        metadata = metadata or {}
+        candidate_name = metadata.get("candidate_name", "unknown")
+        content_hash = metadata.get("content_hash", "")
+        entry = state.setdefault(candidate_name, {}).setdefault(
+            content_hash, {"ids": [], "chunk_count": metadata.get("chunk_count")}
         )
+        entry["ids"].append(record_id)
+    return state
 
-        all_ids = vectorstore._collection.get()["ids"]
-        if all_ids:
-            vectorstore._collection.delete(ids=all_ids)
-            print(f"🧹 Deleted {len(all_ids)} record(s) from ChromaDB.")
-        else:
-            print("ℹ️ No records found to delete.")
+def is_complete(entry: dict | None) -> bool:
+    # A version with fewer chunks than it announced was interrupted mid-write; ids are
+    # deterministic, so re-adding upserts over the partial set and completes it.
+    return entry is not None and len(entry["ids"]) == entry["chunk_count"]
 
-    except Exception as e:
-        print(f"⚠️ Could not load existing DB (may be empty): {e}")
-        settings.DB_DIR.mkdir(parents=True, exist_ok=True)
-        vectorstore = None
+def prepare_chunks(candidate_name: str, text: str, content_hash: str) -> tuple[list[str], list[Document]]:
+    with span("chunk"):
+        documents = chunk_cvs([text], [{"candidate_name": candidate_name, "content_hash": content_hash}])
+    for doc in documents:
+        doc.metadata["chunk_count"] = len(documents)
+    ids = [get_chunk_id(candidate_name, content_hash, doc.metadata["chunk_index"]) for doc in documents]
+    return ids, documents
 
-    documents = get_cv_documents()
+def store_pending_chunks(vectorstore, lexical_index: BM25Index, pending: list[tuple[list[str], list[Document]]]):
+    documents = [doc for _, docs in pending for doc in docs]
     if not documents:
-        print("⚠️ No valid CVs to embed.")
-        return None
+        return
+    with span("embed", chunks=len(documents)):
+        embeddings = iter(get_embedding_model().embed_documents([doc.page_content for doc in documents]))
 
-    vectorstore = Chroma.from_documents(
-        documents=documents,
-        embedding=embedding_model,
-        persist_directory=str(settings.DB_DIR)
-    )
-    print(f"✅ Rebuilt ChromaDB with {len(documents)} document(s).")
+    # One upsert per flush: each call has a fixed cost that dwarfs a few chunks. A crash can still only
+    # leave a candidate complete or detectably partial, since every chunk carries its CV's chunk_count.
+    ids = [chunk_id for chunk_ids, _ in pending for chunk_id in chunk_ids]
+    with span("index_write", chunks=len(documents)):
+        vectorstore._collection.upsert(
+            ids=ids,
+            embeddings=list(embeddings),
+            documents=[doc.page_content for doc in documents],
+            metadatas=[doc.metadata for doc in documents]
+        )
+        for chunk_id, doc in zip(ids, documents):
+            lexical_index.add(chunk_id, doc.page_content)
+
+def sync_lexical_index(vectorstore, lexical_index: BM25Index):
+    # Catches chunks stored before the lexical index existed or written by a run that crashed before saving it
+    chroma_ids = set(vectorstore._collection.get(include=[])["ids"])
+    lexical_ids = lexical_index.ids()
+    lexical_index.remove(list(lexical_ids - chroma_ids))
+
+    missing = list(chroma_ids - lexical_ids)
+    for start in range(0, len(missing), 1000):
+        records = vectorstore._collection.get(ids=missing[start:start + 1000], include=["documents"])
+        for chunk_id, text in zip(records["ids"], records["documents"]):
+            lexical_index.add(chunk_id, text)
+
+    lexical_index.save()
+
+# Writers of the active collection: a full rebuild holds it throughout, incremental writers per batch
+index_lock = threading.Lock()
+
+def remove_candidates(candidate_names: list[str]) -> int:
+    # Drops the candidates' chunks from the active index and publishes a new version, so cleared CVs are neither
+    # retrieved nor served from cached answers
+    if not candidate_names:
+        return 0
+    with index_lock:
+        active = get_active_index()
+        vectorstore = get_vectorstore(active["collection"])
+        lexical_index = get_lexical_index(active["collection"])
+        indexed = get_index_state(vectorstore, candidate_names)
+        removed_ids = [i for versions in indexed.values() for entry in versions.values() for i in entry["ids"]]
+        if not removed_ids:
+            return 0
+        vectorstore.delete(ids=removed_ids)
+        lexical_index.remove(removed_ids)
+        lexical_index.save()
+        # Another model's collection is rebuilt before it is used again; its pointer must keep naming that model
+        if active["embedding_model"] in (None, settings.EMBEDDING_MODEL):
+            set_active_index(active["collection"], active["generation"])
+    return len(removed_ids)
+
+def get_flush_size() -> int:
+    # Enough chunks to keep every concurrent embedding request busy with full batches
+    return settings.EMBED_BATCH_SIZE * settings.EMBED_CONCURRENCY * 4
+
+def create_chroma(full_rebuild: bool = False):
+    active = get_active_index()
+    # Vectors from another embedding model can't share a collection, so a model change forces a rebuild
+    if active["embedding_model"] not in (None, settings.EMBEDDING_MODEL):
+        full_rebuild = True
+
+    # A rebuild fills a fresh collection while queries keep reading the active one, then swaps the pointer
+    if full_rebuild:
+        generation = active["generation"] + 1
+        collection = f"{COLLECTION_PREFIX}{generation}"
+    else:
+        generation = active["generation"]
+        collection = active["collection"]
+
+    vectorstore = get_vectorstore(collection)
+    lexical_index = get_lexical_index(collection)
+    embedding_model = get_embedding_model()
+    indexed = get_index_state(vectorstore)
+    stats = {"added": 0, "kept": 0, "removed": 0}
+    chunk_counts = {}
+    pending = []
+    stale_ids = []
+    flush_size = get_flush_size()
+    embedding_model.reset_stats()
+
+    def flush():
+        store_pending_chunks(vectorstore, lexical_index, pending)
+        log_chunks_to_file([doc for _, docs in pending for doc in docs])
+        # Old versions are only dropped once the new one is stored, so a crash never loses a candidate.
+        if stale_ids:
+            vectorstore.delete(ids=stale_ids)
+            lexical_index.remove(stale_ids)
+        pending.clear()
+        stale_ids.clear()
+
+    # CVs are streamed from disk and their chunks released after each flush, so memory stays at one batch
+    seen_candidates = set()
+    for candidate_name, text in iter_cv_texts():
+        seen_candidates.add(candidate_name)
+        content_hash = hash_text(text)
+        versions = indexed.get(candidate_name, {})
+        current = versions.get(content_hash)
+
+        if is_complete(current):
+            stats["kept"] += len(current["ids"])
+            chunk_counts[candidate_name] = len(current["ids"])
+        else:
+            ids, documents = prepare_chunks(candidate_name, text, content_hash)
+            if documents:
+                pending.append((ids, documents))
+            stats["added"] += len(documents)
+            chunk_counts[candidate_name] = len(documents)
+
+        old_ids = [i for h, entry in versions.items() if h != content_hash for i in entry["ids"]]
+        stale_ids.extend(old_ids)
+        stats["removed"] += len(old_ids)
+
+        if sum(len(docs) for _, docs in pending) >= flush_size:
+            flush()
+
+    for candidate_name, versions in indexed.items():
+        if candidate_name in seen_candidates:
+            continue
+        removed_ids = [i for entry in versions.values() for i in entry["ids"]]
+        stale_ids.extend(removed_ids)
+        stats["removed"] += len(removed_ids)
+
+    flush()
+    sync_lexical_index(vectorstore, lexical_index)
+    candidate_catalog.set_chunk_counts(chunk_counts)
+    if collection != active["collection"]:
+        set_active_index(collection, generation)
+        print(f"✅ Switched the active index to {collection}.")
+        collect_old_collections()
+    elif stats["added"] or stats["removed"] or active["embedding_model"] is None:
+        set_active_index(collection, generation)
+
+    stats["embedding"] = embedding_model.get_stats()
+    print(f"✅ Synced ChromaDB: {stats['added']} chunk(s) added, {stats['kept']} kept, {stats['removed']} removed.")
+    print(f"ℹ️ Embedding cache: {stats['embedding']['hits']} hit(s), {stats['embedding']['misses']} miss(es), {stats['embedding']['chunks_per_sec']} chunks/sec.")
 
-    return vectorstore
+    return vectorstore, stats
 
-def load_chroma():
+def load_chroma(collection: str):
+    from langchain_community.vectorstores import Chroma
     return Chroma(
-        embedding_function=embedding_model,
+        collection_name=collection,
+        embedding_function=get_embedding_model(),
         persist_directory=str(settings.DB_DIR)
     )
 
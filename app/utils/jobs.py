@@ -0,0 +1,189 @@
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from app.utils.config import settings
+
+class JobCancelled(Exception):
+    pass
+
+class IngestJob:
+    # One upload batch: its own directory, the CVs it produced so far, and where it is now
+    def __init__(self, job_id: str, session: str, directory: Path):
+        self.id = job_id
+        self.session = session
+        self.directory = directory
+        self.files = []
+        self.structured = []
+        # The subset of structured that this batch added to the catalog; only these are cleared with it
+        self.created = []
+        self.counts = {}
+        self.stage = None
+        self.state = "created"
+        self.done = 0
+        self.total = 0
+        self.message = ""
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.pending = deque()
+        self.discarded = False
+        self._cancel = threading.Event()
+        # Set whenever no stage of this batch is queued or running
+        self._idle = threading.Event()
+        self._idle.set()
+
+    @property
+    def busy(self) -> bool:
+        return self.state in ("queued", "running")
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def update(self, message: str, done: int = None, total: int = None):
+        self.message = message
+        if done is not None:
+            self.done = done
+        if total is not None:
+            self.total = total
+        self.updated_at = time.time()
+
+    def check_cancelled(self):
+        # Stages call this between units of work; anything already written stays consistent
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def status(self) -> dict:
+        return {
+            "id": self.id,
+            "stage": self.stage,
+            "state": self.state,
+            "done": self.done,
+            "total": self.total,
+            "message": self.message,
+            "files": len(self.files),
+            "counts": dict(self.counts),
+            "structured": len(self.structured),
+            "queued_stages": [stage for stage, _ in self.pending],
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+class JobManager:
+    def __init__(self, root: Path, max_workers: int, retention_seconds: float):
+        self.root = root
+        self.max_workers = max(1, max_workers)
+        self.retention_seconds = retention_seconds
+        self._executor = None
+        self._jobs = {}
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest")
+        return self._executor
+
+    def create(self, session: str, files: list[Path] = ()) -> IngestJob:
+        self.prune()
+        job_id = uuid.uuid4().hex[:12]
+        job = IngestJob(job_id, session, self.root / job_id)
+        job.directory.mkdir(parents=True, exist_ok=True)
+        for f in files:
+            path = job.directory / Path(f).name
+            shutil.copy(f, path)
+            job.files.append(path)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._latest[session] = job_id
+        return job
+
+    def get(self, job_id: str) -> IngestJob | None:
+        return self._jobs.get(job_id)
+
+    def latest(self, session: str) -> IngestJob | None:
+        return self._jobs.get(self._latest.get(session))
+
+    def session_jobs(self, session: str) -> list[IngestJob]:
+        return [job for job in list(self._jobs.values()) if job.session == session]
+
+    def run(self, job: IngestJob, stage: str, func):
+        # Stages of one batch run in click order; different batches run side by side on the pool
+        with self._lock:
+            job.pending.append((stage, func))
+            if job.busy:
+                return
+            self._start_next(job)
+
+    def _start_next(self, job: IngestJob):
+        stage, func = job.pending.popleft()
+        job._cancel.clear()
+        job._idle.clear()
+        job.stage = stage
+        job.state = "queued"
+        job.update("🟡 Queued...", 0, 0)
+        self._get_executor().submit(self._run, job, func)
+
+    def _run(self, job: IngestJob, func):
+        job.state = "running"
+        try:
+            job.check_cancelled()
+            message = func(job)
+            job.state = "done"
+            job.update(message)
+        except JobCancelled:
+            job.state = "cancelled"
+            job.pending.clear()
+            job.update("🛑 Cancelled.")
+        except Exception as e:
+            print(f"❌ Ingest job {job.id} failed at {job.stage}: {e}")
+            job.state = "failed"
+            job.pending.clear()
+            job.update(f"❌ {e}")
+        with self._lock:
+            if job.pending and not job.discarded:
+                self._start_next(job)
+                return
+            job._idle.set()
+        if job.discarded:
+            self._cleanup(job)
+
+    def cancel(self, job: IngestJob) -> bool:
+        with self._lock:
+            job.pending.clear()
+            if not job.busy:
+                return False
+            job._cancel.set()
+            return True
+
+    def wait(self, job: IngestJob, timeout: float = None) -> bool:
+        # True once the batch has stopped, i.e. it won't produce any more CVs
+        return job._idle.wait(timeout)
+
+    def remove(self, job: IngestJob):
+        # A running stage notices the cancel at its next checkpoint; its files go once it has stopped
+        with self._lock:
+            job.discarded = True
+            job.pending.clear()
+            job._cancel.set()
+            busy = job.busy
+        if not busy:
+            self._cleanup(job)
+
+    def _cleanup(self, job: IngestJob):
+        shutil.rmtree(job.directory, ignore_errors=True)
+        with self._lock:
+            self._jobs.pop(job.id, None)
+            if self._latest.get(job.session) == job.id:
+                del self._latest[job.session]
+
+    def prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job in list(self._jobs.values()):
+            if not job.busy and job.updated_at < cutoff:
+                self._cleanup(job)
+
+ingest_jobs = JobManager(settings.UPLOAD_DIR, settings.INGEST_WORKERS, settings.JOB_RETENTION_SECONDS)
@@ -0,0 +1,105 @@
+import math
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+from app.utils.text import preprocess, tokenize_cv
+
+class BM25Index:
+    def __init__(self, path: Path, k1: float = 1.5, b: float = 0.75):
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.postings = {}
+        self.doc_terms = {}
+        self.total_length = 0
+        self.load()
+
+    def load(self):
+        with self._lock:
+            self.postings = {}
+            self.doc_terms = {}
+            self.total_length = 0
+            if not self.path.exists():
+                return
+            import joblib
+            try:
+                state = joblib.load(self.path)
+            except Exception as e:
+                print(f"⚠️ Could not load lexical index, it will be rebuilt: {e}")
+                return
+            self.postings = state["postings"]
+            self.doc_terms = state["doc_terms"]
+            self.total_length = state["total_length"]
+
+    def save(self):
+        import joblib
+        # Only the copy is taken under the index lock, so searches aren't held up while it is written out.
+        # Saves queue behind each other, so an older copy never replaces a newer one.
+        with self._save_lock:
+            with self._lock:
+                state = {
+                    "postings": {term: dict(docs) for term, docs in self.postings.items()},
+                    "doc_terms": dict(self.doc_terms),
+                    "total_length": self.total_length
+                }
+            tmp_path = self.path.with_suffix(".tmp")
+            joblib.dump(state, tmp_path)
+            os.replace(tmp_path, self.path)
+
+    def ids(self) -> set[str]:
+        with self._lock:
+            return set(self.doc_terms)
+
+    def add(self, chunk_id: str, text: str):
+        counts = Counter(tokenize_cv(preprocess(text)))
+        with self._lock:
+            self._remove(chunk_id)
+            for term, count in counts.items():
+                self.postings.setdefault(term, {})[chunk_id] = count
+            self.doc_terms[chunk_id] = (list(counts), sum(counts.values()))
+            self.total_length += sum(counts.values())
+
+    def remove(self, chunk_ids: list[str]):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._remove(chunk_id)
+
+    def _remove(self, chunk_id: str):
+        terms, length = self.doc_terms.pop(chunk_id, ((), 0))
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= length
+
+    def search(self, query: str, k: int = 20, chunk_filter=None) -> list[tuple[str, float]]:
+        terms = set(tokenize_cv(preprocess(query)))
+        with self._lock:
+            n_docs = len(self.doc_terms)
+            if not n_docs:
+                return []
+            avg_length = self.total_length / n_docs
+            scores = Counter()
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    if chunk_filter is not None and not chunk_filter(chunk_id):
+                        continue
+                    length = self.doc_terms[chunk_id][1]
+                    scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+        return scores.most_common(k)
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[str]:
+    scores = Counter()
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] += 1 / (k + rank + 1)
+    return [item for item, _ in scores.most_common()]
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.config import settings
+
+class RequestLimiter:
+    # One cap shared by sync code (worker threads) and async handlers on the event loop.
+    # A limiter with a parent also takes one of the parent's slots, so a class of work can be kept below the overall cap.
+    def __init__(self, max_concurrency: int, parent: "RequestLimiter" = None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.parent = parent
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._waiters = None
+        self.in_flight = 0
+
+    def acquire(self):
+        self._semaphore.acquire()
+        if self.parent is not None:
+            try:
+                self.parent.acquire()
+            except BaseException:
+                self._semaphore.release()
+                raise
+        with self._lock:
+            self.in_flight += 1
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        if self.parent is not None:
+            self.parent.release()
+        self._semaphore.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def _get_waiters(self) -> ThreadPoolExecutor:
+        # Threads of its own, so coroutines waiting for a slot never tie up the default executor
+        with self._lock:
+            if self._waiters is None:
+                self._waiters = ThreadPoolExecutor(max_workers=32, thread_name_prefix="limiter")
+            return self._waiters
+
+    async def __aenter__(self):
+        # Waits in the semaphore's own queue, in turn with threads already waiting. A caller cancelled meanwhile
+        # hands the slot back as soon as its waiter gets it.
+        waiter = self._get_waiters().submit(self.acquire)
+        try:
+            await asyncio.shield(asyncio.wrap_future(waiter))
+        except asyncio.CancelledError:
+            # Runs on the waiter thread (or right here if it already got the slot), even once the loop is gone
+            waiter.add_done_callback(lambda f: self.release() if not f.cancelled() and f.exception() is None else None)
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+# Chat (query embeddings and answers) takes from the whole cap. Everything else (summaries, name extraction, CV
+# embeddings) shares a smaller one, so OLLAMA_CHAT_RESERVED slots are always left for a chat question.
+ollama_limiter = RequestLimiter(settings.OLLAMA_MAX_CONCURRENCY)
+background_limiter = RequestLimiter(settings.OLLAMA_MAX_CONCURRENCY - settings.OLLAMA_CHAT_RESERVED, parent=ollama_limiter)
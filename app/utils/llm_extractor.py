@@ -1,11 +1,12 @@
-from langchain_ollama import ChatOllama
+import re
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.prompts import ChatPromptTemplate
+from app.utils.cache import DiskCache
 from app.utils.config import settings
-
-llm = ChatOllama(
-    model=settings.LLM_MODEL,
-    temperature=0.1
-)
+from app.utils.limiter import background_limiter
+from app.utils.metrics import span
+from app.utils.registry import registry
+from app.utils.text import hash_text
 
 prompt = ChatPromptTemplate.from_template("""
 You will be given the text of a candidate's CV.
@@ -19,8 +20,126 @@ Name:
 """)
 
 
-chain = prompt | llm
+def create_chain():
+    from langchain_ollama import ChatOllama
+    llm = ChatOllama(
+        model=settings.LLM_MODEL,
+        temperature=0.1,
+        base_url=settings.OLLAMA_BASE_URL
+    )
+    return prompt | llm
+
+registry.register("name_chain", create_chain)
+
+name_cache = DiskCache(settings.CACHE_DIR / "candidate_names.sqlite")
+
+NAME_LABELS = {"name", "name:", "resume", "résumé", "cv", "curriculum", "vitae", "cv:", "resume:"}
+
+# Words that commonly follow (or replace) the name on the first line of a CV
+NOT_NAME_WORDS = {
+    "curriculum", "vitae", "resume", "profile", "summary", "contact", "personal", "information", "details",
+    "objective", "experience", "education", "skills", "email", "phone", "mobile", "address", "linkedin",
+    "senior", "junior", "lead", "principal", "software", "engineer", "developer", "data", "scientist",
+    "analyst", "manager", "designer", "consultant", "intern", "student", "graduate", "full", "stack",
+    "backend", "frontend", "machine", "learning", "ai", "ml", "devops", "cloud", "web", "android", "ios"
+}
+
+NAME_TOKEN = re.compile(r"^(?:[A-Z][a-z]+(?:['\-][A-Z]?[a-z]+)*|[A-Z]'[A-Z][a-z]+|[A-Z]{2,}|[A-Z]\.)$")
+
+def get_cv_head(cv_text: str) -> str:
+    return cv_text[:settings.NAME_HEAD_CHARS]
+
+def guess_candidate_name(cv_text: str) -> str | None:
+    tokens = get_cv_head(cv_text).split()[:12]
+    while tokens and tokens[0].lower() in NAME_LABELS:
+        tokens.pop(0)
+
+    run = []
+    for token in tokens[:5]:
+        if not NAME_TOKEN.match(token):
+            break
+        run.append(token)
+
+    stopped_at_title = False
+    for i, token in enumerate(run):
+        if token.lower().strip(".") in NOT_NAME_WORDS:
+            run = run[:i]
+            stopped_at_title = True
+            break
+
+    # A run of four or more capitalised words is as likely to be "Name + Job Title" as a long name; leave it to the LLM.
+    # The same goes for three words before a title: "John Smith Python Developer" can't be told from a three-part name.
+    if stopped_at_title and len(run) > 2:
+        return None
+    if not 2 <= len(run) <= 3 or (len(tokens) > len(run) and not stopped_at_title and NAME_TOKEN.match(tokens[len(run)])):
+        return None
+    return " ".join(run)
+
+def timed_guess(cv_text: str) -> str | None:
+    with span("name_extract_heuristic"):
+        return guess_candidate_name(cv_text)
 
 def get_candidate_name(cv_text: str) -> str:
-    response = chain.invoke({"cv_text": cv_text})
-    return response.content.strip()
+    return get_candidate_names([cv_text])[0][0]
+
+def extract_names_with_llm(cv_texts: list[str]) -> list:
+    # Sync calls on a thread pool: an event loop per batch would strand the cached chain's async client on a closed loop
+    def extract(text: str):
+        with background_limiter, span("name_extract_llm"):
+            return registry.get("name_chain").invoke({"cv_text": get_cv_head(text)})
+
+    with ThreadPoolExecutor(max_workers=settings.NAME_CONCURRENCY) as executor:
+        futures = [executor.submit(extract, text) for text in cv_texts]
+
+    responses = []
+    for future in futures:
+        try:
+            responses.append(future.result())
+        except Exception as e:
+            responses.append(e)
+    return responses
+
+def get_name_cache_key(cv_text: str) -> str:
+    # Only LLM answers are cached. Heuristic guesses are cheap to redo, and the prefix keeps entries written
+    # when guesses were cached too from being served.
+    return f"llm:{hash_text(cv_text)}"
+
+def get_candidate_names(cv_texts: list[str]) -> tuple[list[str | None], dict]:
+    stats = {"cache": 0, "heuristic": 0, "llm": 0, "failed": 0}
+    names = [None] * len(cv_texts)
+    resolved = {}
+    llm_positions = {}
+
+    unguessed = {}
+    for i, text in enumerate(cv_texts):
+        if (guess := timed_guess(text)) is not None:
+            names[i] = guess
+            stats["heuristic"] += 1
+        else:
+            unguessed[i] = get_name_cache_key(text)
+
+    cached = name_cache.get_many(list(unguessed.values()))
+    for i, key in unguessed.items():
+        if key in cached:
+            names[i] = cached[key].decode("utf-8")
+            stats["cache"] += 1
+        else:
+            # Duplicate CVs in one batch share a single LLM call
+            llm_positions.setdefault(key, []).append(i)
+
+    if llm_positions:
+        responses = extract_names_with_llm([cv_texts[positions[0]] for positions in llm_positions.values()])
+        for (key, positions), response in zip(llm_positions.items(), responses):
+            if isinstance(response, Exception):
+                print(f"❌ Name extraction failed: {response}")
+                stats["failed"] += len(positions)
+                continue
+            name = response.content.strip()
+            for i in positions:
+                names[i] = name
+            stats["llm"] += len(positions)
+            if name:
+                resolved[key] = name
+
+    name_cache.set_many({key: name.encode("utf-8") for key, name in resolved.items()})
+    return names, stats
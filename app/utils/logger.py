@@ -1,25 +1,126 @@
+import atexit
 import datetime
-from pathlib import Path
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import shutil
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from langchain_core.documents import Document
 from app.utils.config import settings
 
-PROMPT_LOG_FILE = settings.LOG_DIR / Path("debug_logs.txt")
-CHUNKS_LOG_FILE = settings.LOG_DIR / Path("chunks_log.txt")
+PROMPT_LOG_FILE = settings.LOG_DIR / "debug_logs.jsonl"
+CHUNKS_LOG_FILE = settings.LOG_DIR / "chunks_log.jsonl"
+TRACE_LOG_FILE = settings.LOG_DIR / "traces.jsonl"
+
+# logger name -> file it is written to by the background listener
+LOG_FILES = {"debug": PROMPT_LOG_FILE, "chunks": CHUNKS_LOG_FILE, "traces": TRACE_LOG_FILE}
+
+class GzipRotatingFileHandler(RotatingFileHandler):
+    # Size-rotated file whose rolled-over segments are gzipped (debug_logs.jsonl.1.gz, .2.gz, ...)
+    def __init__(self, filename, max_bytes: int, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self.compress
+
+    @staticmethod
+    def compress(source: str, dest: str):
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+class DroppingQueueHandler(QueueHandler):
+    # Never blocks the request path: when the writer falls behind, records are counted and dropped
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The message is already a JSON line; skip QueueHandler's formatting copy
+        return record
+
+log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+queue_handler = DroppingQueueHandler(log_queue)
+listener = None
+listener_lock = threading.Lock()
+
+def get_file_logger(name: str) -> logging.Logger:
+    logger = logging.getLogger(f"recruiter.{name}")
+    if not logger.handlers:
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(queue_handler)
+    start_listener()
+    return logger
+
+def start_listener():
+    global listener
+    with listener_lock:
+        if listener is not None:
+            return
+        handlers = []
+        for name, path in LOG_FILES.items():
+            handler = GzipRotatingFileHandler(path, settings.LOG_MAX_BYTES, settings.LOG_BACKUP_COUNT)
+            handler.addFilter(logging.Filter(f"recruiter.{name}"))
+            handlers.append(handler)
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=False)
+        listener.start()
+        atexit.register(stop_listener)
+
+def stop_listener():
+    # Flushes whatever is still queued before the process exits
+    global listener
+    with listener_lock:
+        if listener is not None:
+            listener.stop()
+            listener = None
+
+def truncate(text: str, limit: int) -> tuple[str, bool]:
+    if limit <= 0 or len(text) <= limit:
+        return text, False
+    return text[:limit], True
 
 def log_debug(question: str, context: str):
-    timestamp = datetime.datetime.now().isoformat()
-    PROMPT_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-    
-    with open(PROMPT_LOG_FILE, "a", encoding="utf-8") as log:
-        log.write(f"\n==== {timestamp} ====\n")
-        log.write(f"Question:\n{question.strip()}\n\n")
-        log.write("Retrieved Context:\n")
-        log.write(context.strip() + "\n")
-        
+    if settings.LOG_SAMPLE_RATE < 1 and random.random() >= settings.LOG_SAMPLE_RATE:
+        return
+
+    context, truncated = truncate(context.strip(), settings.LOG_MAX_CONTEXT_CHARS)
+    record = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "question": question.strip(),
+        "context": context,
+        "context_truncated": truncated
+    }
+    get_file_logger("debug").info(json.dumps(record, ensure_ascii=False))
+
 def log_chunks_to_file(documents: list[Document]):
-    with open(CHUNKS_LOG_FILE, "w", encoding="utf-8") as f:
-        for i, doc in enumerate(documents):
-            fname = doc.metadata.get("candidate_name", f"doc_{i}")
-            f.write(f"\n--- Chunk {i+1} from {fname} ---\n")
-            f.write(doc.page_content + "\n")
-            f.write(f"Length: {len(doc.page_content)} characters\n")
+    # A full dump of every chunk is only useful while debugging the chunker
+    if not settings.DEBUG_CHUNK_LOG:
+        return
+
+    logger = get_file_logger("chunks")
+    timestamp = datetime.datetime.now().isoformat()
+    for i, doc in enumerate(documents):
+        record = {
+            "timestamp": timestamp,
+            "candidate_name": doc.metadata.get("candidate_name", f"doc_{i}"),
+            "chunk_index": doc.metadata.get("chunk_index", i),
+            "length": len(doc.page_content),
+            "text": doc.page_content
+        }
+        logger.info(json.dumps(record, ensure_ascii=False))
+
+def log_trace(record: dict):
+    get_file_logger("traces").info(json.dumps(record, ensure_ascii=False))
+
+def get_log_stats() -> dict:
+    return {"queued": log_queue.qsize(), "dropped": queue_handler.dropped}
@@ -0,0 +1,190 @@
+import bisect
+import contextvars
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.utils.config import settings
+from app.utils.logger import log_trace
+
+# Upper bounds in seconds; wide enough for a cache hit (ms) and a cold LLM call (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = {name: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for name, value in labels.items()}
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped.items()) + "}"
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...], buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts, sum, count]
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{format_labels({**labels, 'le': f'{bound:g}'})} {cumulative}")
+            lines.append(f"{self.name}_bucket{format_labels({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def increment(self, value: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{format_labels(dict(zip(self.label_names, key)))} {value:g}")
+        return lines
+
+stage_seconds = Histogram("recruiter_stage_seconds", "Time spent in each pipeline stage.", ("stage",))
+ttft_seconds = Histogram("recruiter_time_to_first_token_seconds", "Time from request to the first streamed LLM token.", ("operation",))
+tokens_per_second = Histogram("recruiter_tokens_per_second", "LLM streaming rate after the first token.", ("operation",), RATE_BUCKETS)
+generated_tokens = Counter("recruiter_generated_tokens_total", "Streamed LLM tokens.", ("operation",))
+requests_total = Counter("recruiter_requests_total", "Requests by operation and outcome.", ("operation", "outcome"))
+
+METRICS = [stage_seconds, ttft_seconds, tokens_per_second, generated_tokens, requests_total]
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+def record_stage(stage: str, seconds: float, **attributes):
+    stage_seconds.observe(seconds, stage=stage)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds, **attributes)
+
+@contextmanager
+def span(stage: str, **attributes):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start, **attributes)
+
+class Trace:
+    # One request's spans, written as a single JSONL line when TRACE_REQUESTS is on
+    def __init__(self, operation: str, **attributes):
+        self.record = {"trace_id": uuid.uuid4().hex, "operation": operation, "started_at": time.time(), "spans": [], **attributes}
+        self.start = time.perf_counter()
+
+    def add(self, stage: str, seconds: float, **attributes):
+        self.record["spans"].append({"stage": stage, "seconds": round(seconds, 6), **attributes})
+
+    def run(self, func, *args, **kwargs):
+        # Spans recorded anywhere inside func (on this thread) land in this trace
+        token = current_trace.set(self)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            current_trace.reset(token)
+
+    def finish(self, **attributes):
+        if not settings.TRACE_REQUESTS:
+            return
+        self.record.update(attributes, seconds=round(time.perf_counter() - self.start, 6))
+        log_trace(self.record)
+
+class StreamTimer:
+    # Tracks one streamed LLM response: time to first token, then the token rate.
+    # Used as a context manager it finishes with self.outcome, or "error" / "cancelled" if the stream raised or
+    # was abandoned (GeneratorExit and task cancellation aren't Exceptions).
+    def __init__(self, operation: str, trace: Trace = None):
+        self.operation = operation
+        self.trace = trace
+        self.start = time.perf_counter()
+        self.first_token_at = None
+        self.tokens = 0
+        self.outcome = "ok"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish(self.outcome)
+        else:
+            self.finish("error" if issubclass(exc_type, Exception) else "cancelled")
+
+    def token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            ttft = self.first_token_at - self.start
+            ttft_seconds.observe(ttft, operation=self.operation)
+            if self.trace is not None:
+                self.trace.add("time_to_first_token", ttft)
+        self.tokens += 1
+
+    def finish(self, outcome: str = "ok"):
+        requests_total.increment(operation=self.operation, outcome=outcome)
+        generation = time.perf_counter() - self.first_token_at if self.first_token_at is not None else 0.0
+        if self.tokens:
+            generated_tokens.increment(self.tokens, operation=self.operation)
+        if self.tokens > 1 and generation > 0:
+            tokens_per_second.observe((self.tokens - 1) / generation, operation=self.operation)
+        if self.trace is not None:
+            self.trace.add("generation", generation, tokens=self.tokens)
+            self.trace.finish(outcome=outcome)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port: int = None) -> ThreadingHTTPServer | None:
+    port = settings.METRICS_PORT if port is None else port
+    if not port:
+        return None
+    server = ThreadingHTTPServer((settings.METRICS_HOST, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"ℹ️ Metrics available at http://{settings.METRICS_HOST}:{port}/metrics")
+    return server
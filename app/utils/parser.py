@@ -1,14 +1,26 @@
-import fitz
-import docx2txt
-from typing import List
+import multiprocessing
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List
 from pathlib import Path
-from app.utils.llm_extractor import get_candidate_name
+from app.utils.artifacts import ArtifactStore, hash_file
+from app.utils.catalog import candidate_catalog
+from app.utils.llm_extractor import get_candidate_names
 from app.utils.config import settings
+from app.utils.metrics import record_stage, span
 import re
 
 SUPPORTED_EXTENSIONS = [".pdf", ".docx", ".txt"]
 
+# Bump whenever parse_cv's output changes so stored artifacts are re-parsed
+PARSER_VERSION = 1
+
+artifact_store = ArtifactStore(settings.CACHE_DIR / "parsed_artifacts.sqlite", version=PARSER_VERSION)
+
 def parse_pdf(file_path: Path) -> str:
+    import fitz
     text = ""
     with fitz.open(file_path) as doc:
         for page in doc:
@@ -16,6 +28,7 @@ def parse_pdf(file_path: Path) -> str:
     return text
 
 def parse_docx(file_path: Path) -> str:
+    import docx2txt
     return docx2txt.process(file_path)
 
 def parse_txt(file_path: Path) -> str:
@@ -45,35 +58,163 @@ def parse_cv(file_path: Path) -> dict:
         "text": cleaned
     }
 
-def parse_multiple(files: List[Path]) -> List[dict]:
-    parsed_cvs = []
-    for f in files:
+def parse_cv_timed(file_path: Path) -> dict:
+    start = time.perf_counter()
+    parsed = parse_cv(file_path)
+    parsed["parse_seconds"] = round(time.perf_counter() - start, 4)
+    return parsed
+
+# Set in each parser process: paths are reported here before parsing starts, so a crash can be traced to the files
+# that were actually being parsed rather than every file still queued in the pool
+started_files = None
+
+def init_parse_worker(started):
+    global started_files
+    started_files = started
+
+def parse_cv_reported(file_path: Path) -> dict:
+    # SimpleQueue writes straight to the pipe, so the report survives the worker dying right after
+    started_files.put(str(file_path))
+    return parse_cv_timed(file_path)
+
+def drain_started(started, into: set):
+    while not started.empty():
+        into.add(started.get())
+
+def terminate_workers(executor: ProcessPoolExecutor):
+    # A running call can't be cancelled, so stuck or orphaned workers are killed outright
+    terminate = getattr(executor, "terminate_workers", None)
+    if terminate is not None:
+        terminate()
+        return
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+
+def iter_parse_multiple(files: List[Path], max_workers: int = None, timeout: float = None) -> Iterator[tuple[Path, dict | None, str | None]]:
+    # Yields (path, parsed, error) in completion order; exactly one of parsed/error is set
+    max_workers = max_workers or settings.PARSE_WORKERS
+    timeout = timeout or settings.PARSE_TIMEOUT
+    remaining = []
+    file_hashes = {}
+    file_sizes = {}
+
+    for path in files:
         try:
-            parsed = parse_cv(f)
-            parsed_cvs.append(parsed)
+            file_hashes[path] = hash_file(path)
+            file_sizes[path] = path.stat().st_size
         except Exception as e:
-            print(f"❌ Failed to parse {f.name}: {e}")
-    return parsed_cvs
+            yield path, None, str(e)
+            continue
+        remaining.append(path)
+
+    # Files seen before (by content, under any name) are served from the artifact store
+    stored = artifact_store.get_many(list(set(file_hashes.values())))
+    for path in remaining:
+        artifact = stored.get(file_hashes[path])
+        if artifact is not None:
+            yield path, {**artifact, "filename": path.name, "file_size": file_sizes[path]}, None
+    remaining = [path for path in remaining if file_hashes[path] not in stored]
 
-def structure_and_save(parsed_cvs: List[dict]) -> List[Path]:
-    saved_paths = []
+    # Files that were being parsed when a worker died. Each one is parsed in a pool of its own, so only the file
+    # that crashes by itself is failed; files that were still queued go back into a full pool.
+    suspects = []
+    crashes = {}
+    while remaining or suspects:
+        retry = []
+        restart = False
+        if remaining:
+            batch, isolated = remaining, False
+        else:
+            batch, isolated = [suspects.pop(0)], True
+        reported = multiprocessing.SimpleQueue()
+        executor = ProcessPoolExecutor(max_workers=min(max_workers, len(batch)), initializer=init_parse_worker, initargs=(reported,))
+        futures = {executor.submit(parse_cv_reported, path): path for path in batch}
+        pending = set(futures)
+        started = {}
+        started_paths = set()
 
-    for parsed in parsed_cvs:
         try:
-            candidate_name = get_candidate_name(parsed["text"])
-            if not candidate_name:
-                candidate_name = parsed['filename']
-            parsed['candidate_name']=candidate_name
-                
-            out_name = Path(parsed['candidate_name']).stem + ".txt"
-            out_path = settings.CVS_DIR / out_name
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                # Also keeps the pipe from filling up and blocking the workers
+                drain_started(reported, started_paths)
+                for future in done:
+                    path = futures[future]
+                    try:
+                        parsed = future.result()
+                    except BrokenProcessPool:
+                        # A worker died (e.g. on a malformed PDF) and took the pool with it, failing every queued file too
+                        restart = True
+                        crashes[path] = crashes.get(path, 0) + 1
+                        if isolated:
+                            yield path, None, "parser process crashed"
+                        elif str(path) in started_paths or crashes[path] > 2:
+                            suspects.append(path)
+                        else:
+                            retry.append(path)
+                    except Exception as e:
+                        yield path, None, str(e)
+                    else:
+                        # Timed inside the worker, recorded here where the metrics live
+                        record_stage("parse", parsed["parse_seconds"])
+                        parsed["parsed_at"] = datetime.now(timezone.utc).isoformat()
+                        yield path, {**artifact_store.put(file_hashes[path], parsed), "file_size": file_sizes[path]}, None
 
-            with open(out_path, "w", encoding="utf-8") as f:
-                f.write(parsed['text'])
+                # running() flips when a call is handed to the pool, which can be slightly before a
+                # worker picks it up, so the timeout is a lower bound on the time allowed per file
+                now = time.monotonic()
+                expired = [f for f in pending if f.running() and now - started.setdefault(f, now) > timeout]
+                if expired:
+                    restart = True
+                    for future in expired:
+                        yield futures[future], None, f"timed out after {timeout:g}s"
+                    retry.extend(futures[f] for f in pending if f not in expired)
+                    break
+        finally:
+            if restart:
+                terminate_workers(executor)
+            executor.shutdown(wait=not restart, cancel_futures=True)
+            reported.close()
 
-            saved_paths.append(out_path)
+        remaining = retry
 
-        except Exception as e:
-            print(f"❌ Failed to structure {parsed['filename']}: {e}")
+def parse_multiple(files: List[Path]) -> List[dict]:
+    order = {path: i for i, path in enumerate(files)}
+    results = []
+    for path, parsed, error in iter_parse_multiple(files):
+        if error:
+            print(f"❌ Failed to parse {path.name}: {error}")
+        else:
+            results.append((order[path], parsed))
+    return [parsed for _, parsed in sorted(results, key=lambda r: r[0])]
+
+def save_structured(parsed: dict, candidate_name: str | None) -> tuple[str, bool] | None:
+    # Returns the catalog's display name, which is unique even when two CVs carry the same name, and whether
+    # this CV added the entry rather than matching one already there
+    try:
+        if candidate_name is None:
+            raise RuntimeError("name extraction failed")
+        if not candidate_name:
+            candidate_name = parsed['filename']
+        parsed['candidate_name'] = Path(candidate_name).stem
+
+        record, created = candidate_catalog.register(
+            parsed['candidate_name'],
+            parsed['text'],
+            source_file=parsed['filename'],
+            source_hash=parsed.get('file_hash'),
+            source_size=parsed.get('file_size')
+        )
+        return record['display_name'], created
+
+    except Exception as e:
+        print(f"❌ Failed to structure {parsed['filename']}: {e}")
+        return None
+
+def structure_and_save(parsed_cvs: List[dict]) -> tuple[List[str], dict]:
+    with span("name_extract_batch"):
+        candidate_names, name_stats = get_candidate_names([parsed["text"] for parsed in parsed_cvs])
+    print(f"ℹ️ Candidate names: {name_stats['cache']} from cache, {name_stats['heuristic']} from heuristic, {name_stats['llm']} from LLM.")
 
-    return saved_paths
+    saved = [save_structured(parsed, candidate_name) for parsed, candidate_name in zip(parsed_cvs, candidate_names)]
+    return [result[0] for result in saved if result is not None], name_stats
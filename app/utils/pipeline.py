@@ -0,0 +1,280 @@
+import queue
+import threading
+import time
+from pathlib import Path
+from app.utils.catalog import candidate_catalog
+from app.utils.config import settings
+from app.utils.embedding import (
+    get_active_index, set_active_index, get_vectorstore, get_lexical_index, get_index_state, get_embedding_model,
+    get_flush_size, is_complete, prepare_chunks, store_pending_chunks, create_chroma, index_lock
+)
+from app.utils.llm_extractor import get_candidate_names
+from app.utils.logger import log_chunks_to_file
+from app.utils.parser import iter_parse_multiple, save_structured
+from app.summarizer import pregenerate_summaries
+from app.utils.text import hash_text
+
+# Marks the end of a stage's output
+DONE = object()
+
+class PipelineStopped(Exception):
+    pass
+
+class IngestPipeline:
+    # parse -> name -> chunk -> embed/index, one thread per stage joined by bounded queues.
+    # Parsing runs in its own process pool while naming and embedding wait on Ollama, so the stages
+    # overlap, and every CV is searchable as soon as its batch is written rather than at the end.
+    def __init__(self, files: list[Path], job=None, queue_size: int = None):
+        self.files = list(files)
+        self.job = job
+        self.queue_size = queue_size or settings.PIPELINE_QUEUE_SIZE
+        self.parsed = queue.Queue(self.queue_size)
+        self.named = queue.Queue(self.queue_size)
+        self.chunked = queue.Queue(self.queue_size)
+        self.stop = threading.Event()
+        self.errors = []
+        self.saved_names = []
+        self.created_names = []
+        self.counts = {"total": len(self.files), "parsed": 0, "failed": 0, "named": 0, "chunked": 0, "indexed": 0}
+        self.name_stats = {"cache": 0, "heuristic": 0, "llm": 0, "failed": 0}
+        self.index_stats = {"added": 0, "kept": 0, "removed": 0}
+        self.unpublished = False
+        self._lock = threading.Lock()
+        if job is not None:
+            # The job reports these live and clears its session's CVs from them
+            job.counts = self.counts
+            job.structured = self.saved_names
+            job.created = self.created_names
+
+    def count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.counts[key] += amount
+        if self.job is not None:
+            self.job.update(self.describe(), self.counts["indexed"], self.counts["total"])
+
+    def describe(self) -> str:
+        c = self.counts
+        return f"🟡 Parsed {c['parsed']}/{c['total']} ({c['failed']} failed), named {c['named']}, searchable {c['indexed']}"
+
+    def stopping(self) -> bool:
+        # The job's cancel flag is checked directly: run() only copies it into self.stop every 0.2s
+        return self.stop.is_set() or (self.job is not None and self.job.cancelled)
+
+    def put(self, q: queue.Queue, item):
+        # A full queue holds the producer back, so a fast stage can't run ahead of a slow one
+        while True:
+            if self.stopping():
+                raise PipelineStopped()
+            try:
+                q.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                pass
+
+    def get(self, q: queue.Queue):
+        while True:
+            if self.stop.is_set():
+                raise PipelineStopped()
+            try:
+                return q.get(timeout=0.2)
+            except queue.Empty:
+                pass
+
+    def parse_stage(self):
+        results = iter_parse_multiple(self.files)
+        try:
+            for path, parsed, error in results:
+                if error:
+                    print(f"❌ Failed to parse {path.name}: {error}")
+                    self.count("failed")
+                    continue
+                self.put(self.parsed, parsed)
+                self.count("parsed")
+        finally:
+            # Shuts the parser's process pool down, also when the pipeline is stopped early
+            results.close()
+
+    def name_stage(self):
+        # Several of these run side by side, one CV each, so a slow LLM lookup never holds up heuristic hits
+        while True:
+            parsed = self.get(self.parsed)
+            if parsed is DONE:
+                # Passed on so the other name workers stop too
+                self.parsed.put(DONE)
+                return
+            names, stats = get_candidate_names([parsed["text"]])
+            with self._lock:
+                for key, value in stats.items():
+                    self.name_stats[key] += value
+
+            # Name extraction can take a while; a batch cleared meanwhile must not add the CV after all
+            if self.stopping():
+                raise PipelineStopped()
+            saved = save_structured(parsed, names[0])
+            if saved is None:
+                continue
+            candidate_name, created = saved
+            with self._lock:
+                self.saved_names.append(candidate_name)
+                if created:
+                    self.created_names.append(candidate_name)
+            pregenerate_summaries([parsed["text"]])
+            self.put(self.named, (candidate_name, parsed["text"].strip()))
+            self.count("named")
+
+    def chunk_stage(self):
+        while True:
+            item = self.get(self.named)
+            if item is DONE:
+                return
+            candidate_name, text = item
+            content_hash = hash_text(text)
+            ids, documents = prepare_chunks(candidate_name, text, content_hash)
+            self.put(self.chunked, (candidate_name, content_hash, ids, documents))
+            self.count("chunked")
+
+    def index_stage(self):
+        flush_size = get_flush_size()
+        last_publish = time.monotonic()
+        while True:
+            item = self.get(self.chunked)
+            if item is DONE:
+                return
+            # Whatever is queued, up to a full embedding batch, is written straight away
+            batch, finished = [item], False
+            chunks = len(item[3])
+            while chunks < flush_size:
+                try:
+                    entry = self.chunked.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is DONE:
+                    finished = True
+                    break
+                batch.append(entry)
+                chunks += len(entry[3])
+            if self.write(batch):
+                self.unpublished = True
+            if not self.index_stats.get("deferred"):
+                self.count("indexed", len(batch))
+            if self.unpublished and time.monotonic() - last_publish >= settings.PIPELINE_PUBLISH_SECONDS:
+                self.publish()
+                last_publish = time.monotonic()
+            if finished:
+                return
+
+    def write(self, batch: list[tuple]) -> bool:
+        # Under the index lock, so a full rebuild either sees these CVs on disk or gets them afterwards
+        with index_lock:
+            if self.stopping():
+                # Stopped or cleared while this batch waited for the lock; Clear All may already have removed it
+                return False
+            active = get_active_index()
+            if active["embedding_model"] not in (None, settings.EMBEDDING_MODEL):
+                # The active collection holds another model's vectors; the rebuild at the end picks these CVs up
+                self.index_stats["deferred"] = True
+                return False
+            vectorstore = get_vectorstore(active["collection"])
+            lexical_index = get_lexical_index(active["collection"])
+            # A CV uploaded twice in one batch maps to one candidate, so the last one written is the one indexed
+            latest = {entry[0]: entry for entry in batch}
+            indexed = get_index_state(vectorstore, list(latest))
+
+            pending, stale_ids = [], []
+            for candidate_name, content_hash, ids, documents in latest.values():
+                versions = indexed.get(candidate_name, {})
+                if is_complete(versions.get(content_hash)):
+                    self.index_stats["kept"] += len(ids)
+                elif documents:
+                    pending.append((ids, documents))
+                    self.index_stats["added"] += len(documents)
+                old_ids = [i for h, entry in versions.items() if h != content_hash for i in entry["ids"]]
+                stale_ids.extend(old_ids)
+                self.index_stats["removed"] += len(old_ids)
+
+            if pending:
+                store_pending_chunks(vectorstore, lexical_index, pending)
+                log_chunks_to_file([doc for _, docs in pending for doc in docs])
+            if stale_ids:
+                vectorstore.delete(ids=stale_ids)
+                lexical_index.remove(stale_ids)
+            candidate_catalog.set_chunk_counts({entry[0]: len(entry[2]) for entry in latest.values()})
+            return bool(pending or stale_ids)
+
+    def publish(self):
+        # Other processes re-read the lexical index from disk when the version changes, so it is saved first
+        self.unpublished = False
+        with index_lock:
+            active = get_active_index()
+            if active["embedding_model"] not in (None, settings.EMBEDDING_MODEL):
+                return
+            get_lexical_index(active["collection"]).save()
+            set_active_index(active["collection"], active["generation"])
+
+    def run_stage(self, stage, output: queue.Queue | None, workers: dict):
+        try:
+            stage()
+            # The last worker of a stage tells the next stage that nothing more is coming
+            with self._lock:
+                workers["running"] -= 1
+                last = workers["running"] == 0
+            if output is not None and last:
+                self.put(output, DONE)
+        except PipelineStopped:
+            pass
+        except Exception as e:
+            self.errors.append(e)
+            self.stop.set()
+
+    def run(self) -> dict:
+        embedding_model = get_embedding_model()
+        embedding_model.reset_stats()
+        stages = [
+            (self.parse_stage, self.parsed, 1),
+            (self.name_stage, self.named, max(1, settings.NAME_CONCURRENCY)),
+            (self.chunk_stage, self.chunked, 1),
+            (self.index_stage, None, 1)
+        ]
+        threads = []
+        for stage, output, count in stages:
+            workers = {"running": count}
+            threads += [
+                threading.Thread(target=self.run_stage, args=(stage, output, workers), name=f"ingest-{stage.__name__}", daemon=True)
+                for _ in range(count)
+            ]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                if self.job is not None and self.job.cancelled:
+                    self.stop.set()
+                threads[-1].join(timeout=0.2)
+        finally:
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+            # Whatever was written before a stop or failure is complete per CV, so it is made visible too
+            if self.unpublished:
+                self.publish()
+
+        if self.errors:
+            raise self.errors[0]
+        if self.job is not None:
+            self.job.check_cancelled()
+
+        if self.index_stats.pop("deferred", False):
+            # A model change needs every CV re-embedded into a new collection
+            with index_lock:
+                _, stats = create_chroma()
+            self.index_stats = {key: stats[key] for key in ("added", "kept", "removed")}
+
+        print(
+            f"✅ Ingested {len(self.saved_names)} CV(s): {self.index_stats['added']} chunk(s) added, "
+            f"{self.index_stats['kept']} kept, {self.index_stats['removed']} removed."
+        )
+        return {
+            "counts": dict(self.counts),
+            "names": dict(self.name_stats),
+            "index": dict(self.index_stats),
+            "embedding": embedding_model.get_stats()
+        }
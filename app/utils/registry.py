@@ -0,0 +1,63 @@
+import datetime
+import json
+import sys
+import threading
+import time
+from app.utils.config import settings
+
+# Modules that should only be imported once a tab actually needs them
+HEAVY_MODULES = ["pandas", "plotly", "fitz", "docx2txt", "chromadb", "langchain_ollama", "langchain_community"]
+
+STARTUP_LOG_FILE = settings.LOG_DIR / "startup.jsonl"
+
+class Registry:
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._lock = threading.RLock()
+        self.init_seconds = {}
+        self.startup_seconds = {}
+
+    def register(self, name: str, factory):
+        with self._lock:
+            self._factories[name] = factory
+
+    def get(self, name: str, factory=None):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        # Re-entrant so a factory can pull in other registered objects (e.g. the vector store needs embeddings)
+        with self._lock:
+            # Objects keyed by a runtime value (one vector store per collection) register on first use
+            if factory is not None:
+                self._factories.setdefault(name, factory)
+            if name not in self._instances:
+                start = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self.init_seconds[name] = round(time.perf_counter() - start, 4)
+            return self._instances[name]
+
+    def reset(self, name: str):
+        with self._lock:
+            self._instances.pop(name, None)
+
+    def record_startup(self, step: str, seconds: float):
+        self.startup_seconds[step] = round(seconds, 4)
+
+    def startup_report(self) -> dict:
+        return {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "steps": dict(self.startup_seconds),
+            "initialized": dict(self.init_seconds),
+            "heavy_modules_loaded": [m for m in HEAVY_MODULES if m in sys.modules]
+        }
+
+    def log_startup(self) -> dict:
+        report = self.startup_report()
+        with open(STARTUP_LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report) + "\n")
+        steps = ", ".join(f"{step} {seconds:.2f}s" for step, seconds in report["steps"].items())
+        print(f"ℹ️ Startup: {steps}. Heavy modules loaded: {', '.join(report['heavy_modules_loaded']) or 'none'}.")
+        return report
+
+registry = Registry()
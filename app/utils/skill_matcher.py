@@ -0,0 +1,249 @@
+import json
+import sqlite3
+import threading
+from collections import deque
+from pathlib import Path
+import numpy as np
+from app.utils.cache import LRUCache
+from app.utils.metrics import span
+from app.utils.text import preprocess, tokenize_cv
+
+# canonical skill -> other ways CVs write it; every term of a group counts towards whichever one was asked for.
+# Only unambiguous short forms: "go" or "cv" would match ordinary words in every CV.
+DEFAULT_SYNONYMS = {
+    "kubernetes": ["k8s"],
+    "tensorflow": ["tf"],
+    "javascript": ["js"],
+    "typescript": ["ts"],
+    "postgresql": ["postgres", "psql"],
+    "mongodb": ["mongo"],
+    "react": ["react.js", "reactjs"],
+    "vue.js": ["vue", "vuejs"],
+    "node.js": ["nodejs"],
+    "scikit-learn": ["sklearn"],
+    "c++": ["cpp"],
+    "c#": ["csharp"],
+    "machine learning": ["ml"],
+    "deep learning": ["dl"],
+    "natural language processing": ["nlp"],
+    "large language models": ["llm", "llms"],
+    "amazon web services": ["aws"],
+    "google cloud platform": ["gcp", "google cloud"],
+    "azure": ["microsoft azure"],
+    "power bi": ["powerbi"]
+}
+
+def load_synonyms(path: Path | None = None) -> dict[str, set[str]]:
+    # term -> every preprocessed term of its group. A JSON file in the same shape as DEFAULT_SYNONYMS adds groups or
+    # extends existing ones.
+    entries = {canonical: list(aliases) for canonical, aliases in DEFAULT_SYNONYMS.items()}
+    if path is not None and Path(path).exists():
+        try:
+            for canonical, aliases in json.loads(Path(path).read_text(encoding="utf-8")).items():
+                entries.setdefault(canonical, []).extend(aliases)
+        except Exception as e:
+            print(f"⚠️ Could not load skill synonyms from {path}: {e}")
+
+    groups = {}
+    for canonical, aliases in entries.items():
+        terms = {preprocess(term) for term in [canonical, *aliases]} - {""}
+        # A term under two canonicals ("tf") expands to both, but the canonicals don't expand to each other
+        for term in terms:
+            groups.setdefault(term, set()).update(terms)
+    return groups
+
+class SkillMatcher:
+    # Aho-Corasick over tokens rather than characters, so a term only matches whole words ("java" never
+    # counts inside "javascript"). Size grows with the patterns, not with the CVs they are run against.
+    def __init__(self, patterns: list[list[str]], encode=None):
+        # patterns[i] holds the preprocessed terms that count towards skill i. encode maps a term's tokens to
+        # whatever the matched sequences hold instead (e.g. TokenStore ids).
+        self.size = len(patterns)
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        for skill, terms in enumerate(patterns):
+            for term in set(terms):
+                tokens = tokenize_cv(term)
+                if tokens:
+                    self._add(list(encode(tokens)) if encode else tokens, skill)
+        self._link()
+
+    def tokens(self) -> set:
+        # Every token that appears in some pattern; any other token ends a match in progress
+        return set(self.goto[0]).union(*(state.keys() for state in self.goto[1:]))
+
+    def _add(self, tokens: list[str], skill: int):
+        state = 0
+        for token in tokens:
+            nxt = self.goto[state].get(token)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][token] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            state = nxt
+        self.outputs[state].append((skill, len(tokens)))
+
+    def _link(self):
+        # Breadth-first, so every state's failure link points at an already finished, shallower state
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for token, nxt in self.goto[state].items():
+                pending.append(nxt)
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(token, 0)
+                self.outputs[nxt] = self.outputs[nxt] + self.outputs[self.fail[nxt]]
+
+    def count(self, tokens: list, positions: list[int] = None) -> list[int]:
+        # One pass over the tokens. Overlapping matches of one skill ("microsoft azure" and "azure") count once.
+        # positions[i] is where tokens[i] sits in the CV when tokens matching no pattern were left out; a gap
+        # ends any match in progress, exactly as those tokens would have.
+        counts = [0] * self.size
+        last_end = [-1] * self.size
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        previous = -1
+        for index, token in enumerate(tokens):
+            position = positions[index] if positions is not None else index
+            if position != previous + 1:
+                state = 0
+            previous = position
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if not state:
+                continue
+            for skill, length in outputs[state]:
+                if position - length >= last_end[skill]:
+                    counts[skill] += 1
+                    last_end[skill] = position
+        return counts
+
+class TokenStore:
+    # Every CV preprocessed and tokenized once, keyed by content hash. Tokens are kept as int32 ids into a shared
+    # vocabulary, so a new skill list costs a matcher pass over stored ids instead of reading and preprocessing
+    # the whole corpus again.
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vocabulary (token TEXT PRIMARY KEY, id INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS tokens (content_hash TEXT PRIMARY KEY, ids BLOB NOT NULL)")
+        self._conn.commit()
+        self.vocabulary = dict(self._conn.execute("SELECT token, id FROM vocabulary").fetchall())
+
+    def encode(self, tokens: list[str]) -> np.ndarray:
+        with self._lock:
+            ids = np.array([self._token_id(token) for token in tokens], dtype=np.int32)
+            self._conn.commit()
+        return ids
+
+    def _token_id(self, token: str) -> int:
+        token_id = self.vocabulary.get(token)
+        if token_id is None:
+            token_id = self.vocabulary[token] = len(self.vocabulary)
+            self._conn.execute("INSERT INTO vocabulary (token, id) VALUES (?, ?)", (token, token_id))
+        return token_id
+
+    def get_many(self, content_hashes: list[str]) -> dict[str, np.ndarray]:
+        content_hashes = list(dict.fromkeys(content_hashes))
+        found = {}
+        with self._lock:
+            for start in range(0, len(content_hashes), 500):
+                batch = content_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(f"SELECT content_hash, ids FROM tokens WHERE content_hash IN ({placeholders})", batch)
+                found.update((content_hash, np.frombuffer(ids, dtype=np.int32)) for content_hash, ids in rows)
+        return found
+
+    def add_many(self, texts: dict[str, str]) -> dict[str, np.ndarray]:
+        # content hash -> CV text; returns the stored ids
+        encoded = {}
+        with self._lock:
+            for content_hash, text in texts.items():
+                encoded[content_hash] = np.array([self._token_id(token) for token in tokenize_cv(preprocess(text))], dtype=np.int32)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tokens (content_hash, ids) VALUES (?, ?)",
+                [(content_hash, ids.tobytes()) for content_hash, ids in encoded.items()]
+            )
+            self._conn.commit()
+        return encoded
+
+    def prune(self, keep: set[str]) -> int:
+        # Drops CVs that were removed or replaced since they were tokenized
+        with self._lock:
+            stored = [row[0] for row in self._conn.execute("SELECT content_hash FROM tokens")]
+            stale = [content_hash for content_hash in stored if content_hash not in keep]
+            self._conn.executemany("DELETE FROM tokens WHERE content_hash = ?", [(content_hash,) for content_hash in stale])
+            self._conn.commit()
+        return len(stale)
+
+class SkillCounter:
+    # Counts requested skills per CV by running one compiled matcher over each CV's stored tokens. Results are kept
+    # per skill list and content hash, so repeated queries only rescan CVs added or changed since.
+    def __init__(self, catalog, tokens: TokenStore, synonyms: dict[str, set[str]], cache_size: int, page_size: int = 500):
+        self.catalog = catalog
+        self.tokens = tokens
+        self.synonyms = synonyms
+        self.cache = LRUCache(cache_size)
+        self.page_size = page_size
+        self._pruned = False
+
+    def expand(self, skill: str) -> list[str]:
+        return sorted(self.synonyms.get(skill, set()) | {skill})
+
+    def iter_pages(self, cv_ids: list[str], current: dict[str, str]):
+        # Lists of (cv_id, token ids), a page at a time; CVs not tokenized yet are read, tokenized and stored once
+        for start in range(0, len(cv_ids), self.page_size):
+            page = cv_ids[start:start + self.page_size]
+            encoded = self.tokens.get_many([current[cv_id] for cv_id in page])
+            missing = [cv_id for cv_id in page if current[cv_id] not in encoded]
+            if missing:
+                with span("skill_tokenize", cvs=len(missing)):
+                    encoded.update(self.tokens.add_many({current[cv_id]: text for cv_id, text in self.catalog.iter_texts(missing)}))
+            yield [(cv_id, encoded[current[cv_id]]) for cv_id in page if current[cv_id] in encoded]
+
+    def lookup(self, skills: list[str]) -> tuple[list[str], np.ndarray]:
+        key = tuple(skills)
+        current = self.catalog.hashes()
+        if not self._pruned:
+            # Once per process: removed and replaced CVs only cost disk space until then
+            self.tokens.prune(set(current.values()))
+            self._pruned = True
+        rows = {cv_id: row for cv_id, row in (self.cache.get(key) or {}).items() if cv_id in current}
+        stale = [cv_id for cv_id, content_hash in current.items() if cv_id not in rows or rows[cv_id][0] != content_hash]
+
+        if stale:
+            matcher = SkillMatcher([self.expand(skill) for skill in skills], encode=self.tokens.encode)
+            # Flags the ids that occur in some pattern; anything past the last one lands on the final, unset entry
+            pattern_ids = list(matcher.tokens())
+            limit = max(pattern_ids, default=-1) + 1
+            relevant = np.zeros(limit + 1, dtype=bool)
+            relevant[pattern_ids] = True
+            with span("skill_match", cvs=len(stale)):
+                for page in self.iter_pages(stale, current):
+                    if not page:
+                        continue
+                    # One vectorised pass per page finds the only positions that can start or continue a match
+                    starts = np.cumsum([0] + [len(ids) for _, ids in page])
+                    joined = np.concatenate([ids for _, ids in page])
+                    hits = np.flatnonzero(relevant[np.minimum(joined, limit)])
+                    bounds = np.searchsorted(hits, starts)
+                    for i, (cv_id, _) in enumerate(page):
+                        positions = hits[bounds[i]:bounds[i + 1]]
+                        if len(positions):
+                            counts = matcher.count(joined[positions].tolist(), (positions - starts[i]).tolist())
+                        else:
+                            counts = [0] * len(skills)
+                        rows[cv_id] = (current[cv_id], counts)
+            self.cache.set(key, rows)
+
+        cv_ids = sorted(rows)
+        counts = np.array([rows[cv_id][1] for cv_id in cv_ids], dtype=np.int32).reshape(len(cv_ids), len(skills))
+        return cv_ids, counts
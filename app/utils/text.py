@@ -0,0 +1,26 @@
+import hashlib
+import re
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def preprocess(text: str) -> str:
+    # Lowercase everything
+    text = text.lower()
+    
+    # Replace underscores, dashes, commas with spaces
+    text = re.sub(r"[_\-,]", " ", text)
+    
+    # Remove dots at the end of sentences (but not in e.g., ".net" or "node.js")
+    text = re.sub(r"\.(?=\s|$)", "", text)  # removes . only if followed by whitespace or end of line
+
+    # Keep only alphanumerics and relevant symbols (+, #, .) — discard the rest
+    text = re.sub(r"[^a-z0-9+#. ]+", " ", text)
+
+    # Collapse multiple spaces into one
+    text = re.sub(r"\s+", " ", text).strip()
+
+    return text
+
+def tokenize_cv(text: str) -> list:
+    return text.split()
@@ -0,0 +1,63 @@
+"""Compare two benchmark result files and flag regressions.
+
+A stage regresses when its throughput drops, or its p95 latency or peak memory grows, by more
+than the tolerance. Exits with status 1 if anything regressed, so it can gate CI.
+
+    python -m benchmarks.compare baseline.json latest.json --tolerance 0.15
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# metric name -> (getter, True if higher is better)
+METRICS = {
+    "throughput": (lambda stage: stage.get("throughput_per_sec"), True),
+    "p95_ms": (lambda stage: (stage.get("latency") or {}).get("p95_ms"), False),
+    "ttft_p95_ms": (lambda stage: (stage.get("time_to_first_token") or {}).get("p95_ms"), False),
+    "peak_rss_mb": (lambda stage: stage.get("peak_rss_mb"), False),
+}
+
+def compare(baseline: dict, current: dict, tolerance: float, min_ms: float) -> list[dict]:
+    rows = []
+    for scale, result in current["scales"].items():
+        base_result = baseline["scales"].get(scale)
+        if base_result is None:
+            continue
+        for stage_name, stage in result["stages"].items():
+            base_stage = base_result["stages"].get(stage_name)
+            if base_stage is None:
+                continue
+            for metric, (get, higher_is_better) in METRICS.items():
+                old, new = get(base_stage), get(stage)
+                if not old or new is None:
+                    continue
+                # Sub-millisecond latencies are mostly noise
+                if metric.endswith("_ms") and max(old, new) < min_ms:
+                    continue
+                change = (new - old) / old
+                regressed = change < -tolerance if higher_is_better else change > tolerance
+                rows.append({"scale": scale, "stage": stage_name, "metric": metric, "old": old, "new": new, "change": change, "regressed": regressed})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative change, default 10%%")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="ignore latencies below this in both runs")
+    parser.add_argument("--all", action="store_true", help="show every metric, not just regressions")
+    args = parser.parse_args()
+
+    rows = compare(json.loads(args.baseline.read_text()), json.loads(args.current.read_text()), args.tolerance, args.min_ms)
+    shown = rows if args.all else [row for row in rows if row["regressed"]]
+    for row in shown:
+        flag = "REGRESSION" if row["regressed"] else ""
+        print(f"{row['scale']:>6} {row['stage']:<20}{row['metric']:<14}{row['old']:>12.2f} -> {row['new']:>12.2f} ({row['change']:+.1%}) {flag}")
+
+    regressions = sum(row["regressed"] for row in rows)
+    print(f"{regressions} regression(s) in {len(rows)} compared metric(s) (tolerance {args.tolerance:.0%}).")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
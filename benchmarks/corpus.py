@@ -0,0 +1,126 @@
+"""Synthetic CV corpus for the benchmarks: deterministic PDF, DOCX and TXT files at any scale.
+
+    python -m benchmarks.corpus --count 1000 --out /tmp/cvs
+"""
+import argparse
+import random
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+FIRST_NAMES = ["Sara", "Omar", "Mona", "Ahmed", "Laila", "Youssef", "Nour", "Karim", "Hana", "Tarek", "Mariam", "Ali",
+               "Emma", "Liam", "Olivia", "Noah", "Ava", "Lucas", "Mia", "Ethan", "Zeina", "Hassan", "Farah", "Adam"]
+LAST_NAMES = ["Hassan", "Mahmoud", "Ibrahim", "Saleh", "Fathy", "Nasser", "Khalil", "Mansour", "Smith", "Johnson",
+              "Garcia", "Miller", "Davis", "Lopez", "Wilson", "Anderson", "Taylor", "Moore", "Haddad", "Aziz"]
+TITLES = ["Software Engineer", "Data Scientist", "Backend Developer", "Machine Learning Engineer", "DevOps Engineer",
+          "Frontend Developer", "Data Analyst", "Cloud Architect", "QA Engineer", "Mobile Developer"]
+SKILLS = ["Python", "Java", "C#", "C++", "JavaScript", "TypeScript", "SQL", "PostgreSQL", "MongoDB", "Docker",
+          "Kubernetes", "AWS", "Azure", "GCP", "TensorFlow", "PyTorch", "scikit-learn", "Pandas", "React", "Angular",
+          "Node.js", "Django", "Flask", "FastAPI", "Spark", "Airflow", "Kafka", "Redis", "Git", "Linux",
+          "machine learning", "deep learning", "natural language processing", "computer vision", "REST APIs", "CI/CD"]
+SYLLABLES = (["Al", "Ba", "Ka", "Mo", "Na", "Ra", "Sa", "Ta", "Za", "El"], ["din", "har", "lem", "mir", "nor", "rak", "sim", "tar", "wan", "zed"])
+COMPANIES = ["Vodafone", "Orange", "Valeo", "IBM", "Microsoft", "Amazon", "Siemens", "Dell", "Instabug", "Swvl",
+             "Fawry", "Etisalat", "Careem", "Noon", "Talabat", "Paymob"]
+UNIVERSITIES = ["Cairo University", "Ain Shams University", "Alexandria University", "American University in Cairo",
+                "Mansoura University", "Helwan University", "Nile University", "German University in Cairo"]
+VERBS = ["Built", "Designed", "Led", "Maintained", "Optimized", "Migrated", "Automated", "Delivered", "Improved"]
+OBJECTS = ["a payments service", "the data pipeline", "an internal dashboard", "a recommendation engine",
+           "the CI pipeline", "a customer-facing API", "an ETL workflow", "the search backend", "a mobile app"]
+
+FORMATS = (".txt", ".docx", ".pdf")
+
+def generate_cv(index: int, seed: int = 0) -> tuple[str, list[str]]:
+    # Returns (name, lines); the same (index, seed) always yields the same CV
+    rng = random.Random(seed * 1_000_003 + index)
+    # Names are derived from the index so they stay unique up to 48k CVs (the app keys candidates by name)
+    middle = SYLLABLES[0][(index // len(FIRST_NAMES)) % 10] + SYLLABLES[1][(index // (len(FIRST_NAMES) * 10)) % 10]
+    last = LAST_NAMES[(index // (len(FIRST_NAMES) * 100)) % len(LAST_NAMES)]
+    name = f"{FIRST_NAMES[index % len(FIRST_NAMES)]} {middle} {last}"
+    title = rng.choice(TITLES)
+    skills = rng.sample(SKILLS, rng.randint(5, 12))
+    lines = []
+    # Roughly one CV in ten opens with a banner instead of the name, so the LLM name fallback is exercised too
+    if index % 10 == 7:
+        lines.append(f"Curriculum Vitae {title}")
+    lines += [name, title, f"Email: candidate{index}@example.com Phone: +20 100 {index:07d}", ""]
+    lines += ["Summary", f"{title} with {rng.randint(1, 15)} years of experience in {', '.join(skills[:3])}.", ""]
+    lines.append("Experience")
+    for _ in range(rng.randint(2, 5)):
+        start = rng.randint(2008, 2022)
+        lines.append(f"{rng.choice(TITLES)} at {rng.choice(COMPANIES)} ({start} - {start + rng.randint(1, 4)})")
+        for _ in range(rng.randint(2, 4)):
+            lines.append(f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(skills)} and {rng.choice(skills)}.")
+    lines += ["", "Education", f"BSc in Computer Science, {rng.choice(UNIVERSITIES)}, {rng.randint(2005, 2021)}", ""]
+    lines += ["Skills", ", ".join(skills)]
+    return name, lines
+
+def write_txt(path: Path, lines: list[str]):
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+def write_docx(path: Path, lines: list[str]):
+    # The smallest package docx2txt (and Word) will open: content types, one relationship, one document part
+    paragraphs = "".join(f'<w:p><w:r><w:t xml:space="preserve">{escape(line)}</w:t></w:r></w:p>' for line in lines)
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{paragraphs}</w:body></w:document>"
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        "</Types>"
+    )
+    rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="word/document.xml"/></Relationships>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", content_types)
+        archive.writestr("_rels/.rels", rels)
+        archive.writestr("word/document.xml", document)
+
+def write_pdf(path: Path, lines: list[str]):
+    import fitz
+    with fitz.open() as doc:
+        page = doc.new_page()
+        y = 50
+        for line in lines:
+            if y > page.rect.height - 50:
+                page = doc.new_page()
+                y = 50
+            page.insert_text((50, y), line, fontsize=10)
+            y += 14
+        doc.save(path)
+
+WRITERS = {".txt": write_txt, ".docx": write_docx, ".pdf": write_pdf}
+
+def generate_corpus(out_dir: Path, count: int, formats: tuple = FORMATS, seed: int = 0) -> list[Path]:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(count):
+        _, lines = generate_cv(index, seed)
+        ext = formats[index % len(formats)]
+        path = out_dir / f"cv_{index:06d}{ext}"
+        WRITERS[ext](path, lines)
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--out", type=Path, required=True)
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma-separated, e.g. .txt,.pdf")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    paths = generate_corpus(args.out, args.count, tuple(args.formats.split(",")), args.seed)
+    print(f"Wrote {len(paths)} CV(s) to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Deterministic stand-in for the Ollama HTTP API used by the benchmarks and the load tester.
+
+Serves /api/embed, /api/chat (streaming and non-streaming), /api/generate and /api/tags.
+Embeddings are hash-derived, so the same text always gets the same vector; chat answers
+are fixed per prompt. Latencies are configurable to model a real server:
+
+    python -m benchmarks.fake_ollama --port 11434 --token-latency-ms 20 --embed-latency-ms 5
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = (
+    "Based on their CVs, the strongest candidates have several years of Python and cloud experience, "
+    "have led small teams and hold degrees in computer science or a related field."
+)
+
+def embed_text(text: str, dimensions: int) -> list[float]:
+    digest = b""
+    counter = 0
+    while len(digest) < dimensions:
+        digest += hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+        counter += 1
+    vector = [byte / 255 - 0.5 for byte in digest[:dimensions]]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+def answer_for(prompt: str) -> str:
+    # Name extraction prompts end with "Name:"; answer with a stable name derived from the CV
+    if prompt.rstrip().endswith("Name:"):
+        words = re.findall(r"[A-Z][a-z]+", prompt.split("CV:", 1)[-1])
+        return " ".join(words[:2]) or "Unknown Candidate"
+    if "Summary:" in prompt:
+        return "**Skills**\n- Python\n- SQL\n\n**Extracted Insights**\n- **Strengths**: delivery\n- **Areas for Improvement**: cloud"
+    return ANSWER
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    token_latency = 0.0
+    embed_latency = 0.0
+    first_token_latency = 0.0
+    dimensions = 768
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chunk(self, payload: dict):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self.send_json({"models": []})
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/api/embed":
+            texts = body.get("input", [])
+            texts = [texts] if isinstance(texts, str) else texts
+            time.sleep(self.embed_latency)
+            self.send_json({"model": body.get("model"), "embeddings": [embed_text(t, self.dimensions) for t in texts]})
+        elif self.path in ("/api/chat", "/api/generate"):
+            if self.path == "/api/chat":
+                prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+            else:
+                prompt = body.get("prompt", "")
+            self.reply(body, answer_for(prompt), prompt)
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def reply(self, body: dict, answer: str, prompt: str):
+        tokens = re.findall(r"\S+\s*", answer)
+        now = datetime.now(timezone.utc).isoformat()
+        key = "message" if self.path == "/api/chat" else "response"
+        wrap = (lambda text: {"role": "assistant", "content": text}) if key == "message" else (lambda text: text)
+        final = {
+            "model": body.get("model"), "created_at": now, key: wrap(""), "done": True, "done_reason": "stop",
+            "total_duration": 1, "prompt_eval_count": len(prompt.split()), "eval_count": len(tokens)
+        }
+
+        time.sleep(self.first_token_latency)
+        if not body.get("stream", True):
+            time.sleep(self.token_latency * len(tokens))
+            self.send_json({**final, key: wrap(answer)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in tokens:
+            self.send_chunk({"model": body.get("model"), "created_at": now, key: wrap(token), "done": False})
+            time.sleep(self.token_latency)
+        self.send_chunk(final)
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+def serve(host: str = "127.0.0.1", port: int = 11434, token_latency_ms: float = 0, embed_latency_ms: float = 0, first_token_latency_ms: float = 0, dimensions: int = 768):
+    FakeOllamaHandler.token_latency = token_latency_ms / 1000
+    FakeOllamaHandler.embed_latency = embed_latency_ms / 1000
+    FakeOllamaHandler.first_token_latency = first_token_latency_ms / 1000
+    FakeOllamaHandler.dimensions = dimensions
+    server = ThreadingHTTPServer((host, port), FakeOllamaHandler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--token-latency-ms", type=float, default=0)
+    parser.add_argument("--embed-latency-ms", type=float, default=0)
+    parser.add_argument("--first-token-latency-ms", type=float, default=0)
+    parser.add_argument("--dimensions", type=int, default=768)
+    args = parser.parse_args()
+    print(f"Fake Ollama listening on http://{args.host}:{args.port}")
+    serve(args.host, args.port, args.token_latency_ms, args.embed_latency_ms, args.first_token_latency_ms, args.dimensions)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""Load-test one app instance through its real Gradio events and find where it saturates.
+
+Simulated users each hold their own Gradio session and loop over a weighted mix of scenarios
+(chat, summary, skills, ingest), pausing for a random think time between them. Concurrency is
+stepped up (e.g. 1, 2, 4, 8, ... users) and each step reports, per endpoint: throughput, error
+rate, queue wait (join -> process_starts), time to first streamed token and total latency.
+
+Requests speak Gradio's queue protocol directly (queue/join + the session's SSE stream), so
+timings are taken the moment each server message arrives.
+
+    # start a fake LLM and a throwaway app instance, seed it with 200 CVs, then ramp up
+    python -m benchmarks.loadtest --launch --seed-cvs 200 --steps 1,2,4,8,16,32 --step-seconds 30
+
+    # or drive an instance that is already running
+    python -m benchmarks.loadtest --url http://127.0.0.1:7860 --mix chat=1
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from benchmarks.corpus import COMPANIES, SKILLS, UNIVERSITIES, generate_corpus
+from benchmarks.run import ROOT, free_port, start_fake_ollama
+from benchmarks.stats import summarize
+
+# Streaming handlers yield a placeholder ("...") before any LLM output; TTFT is measured from the next update
+PLACEHOLDER_UPDATES = {"stream_chat_interface": 1, "stream_summary_response": 1}
+
+class CallError(Exception):
+    pass
+
+class GradioSession:
+    # One browser tab: its own session hash, so gr.State and per-session dropdown choices are isolated
+    def __init__(self, url: str, config: dict, http):
+        self.url = url.rstrip("/")
+        self.http = http
+        self.session_hash = uuid.uuid4().hex[:12]
+        self.api_prefix = config.get("api_prefix", "/gradio_api")
+        self.endpoints = {dep["api_name"]: (index, dep) for index, dep in enumerate(config["dependencies"]) if dep.get("api_name")}
+        self.candidates = None
+
+    def upload(self, paths: list[Path]) -> list[dict]:
+        files = [("files", (path.name, path.read_bytes())) for path in paths]
+        response = self.http.post(f"{self.url}{self.api_prefix}/upload", files=files)
+        response.raise_for_status()
+        return [
+            {"path": server_path, "orig_name": path.name, "size": path.stat().st_size, "meta": {"_type": "gradio.FileData"}}
+            for server_path, path in zip(response.json(), paths)
+        ]
+
+    def call(self, api_name: str, *inputs) -> dict:
+        index, dep = self.endpoints[api_name]
+        # gr.State inputs live on the server; the browser sends null for them, and so do we
+        data = list(inputs) + [None] * (len(dep["inputs"]) - len(inputs))
+        record = {"endpoint": api_name, "queue_wait": None, "ttft": None, "latency": None, "updates": 0, "error": None}
+        skip = PLACEHOLDER_UPDATES.get(api_name, 0)
+        start = time.perf_counter()
+        try:
+            response = self.http.post(f"{self.url}{self.api_prefix}/queue/join", json={
+                "data": data, "event_data": None, "fn_index": index,
+                "trigger_id": dep["targets"][0][0] if dep.get("targets") else None, "session_hash": self.session_hash
+            })
+            if response.status_code != 200:
+                raise CallError(f"join {response.status_code}: {response.text[:100]}")
+            event_id = response.json()["event_id"]
+
+            output = None
+            with self.http.stream("GET", f"{self.url}{self.api_prefix}/queue/data", params={"session_hash": self.session_hash}) as stream:
+                for line in stream.iter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    message = json.loads(line[5:])
+                    if message.get("event_id") not in (None, event_id):
+                        continue
+                    kind = message.get("msg")
+                    now = time.perf_counter() - start
+                    if kind == "process_starts":
+                        record["queue_wait"] = now
+                    elif kind == "process_generating":
+                        record["updates"] += 1
+                        if record["updates"] == skip + 1:
+                            record["ttft"] = now
+                    elif kind == "process_completed":
+                        if not message.get("success", False):
+                            raise CallError(str((message.get("output") or {}).get("error") or "failed"))
+                        output = (message.get("output") or {}).get("data")
+                        break
+                    elif kind in ("unexpected_error", "close_stream", "server_stopped"):
+                        raise CallError(kind)
+            if output is None:
+                raise CallError("stream ended without a result")
+            record["latency"] = time.perf_counter() - start
+            record["output"] = output
+        except CallError as e:
+            record["error"] = str(e)
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        return record
+
+def choice_values(update: dict) -> list[str]:
+    # Dropdown updates come back as {"choices": [[label, value], ...]}
+    return [choice[1] if isinstance(choice, (list, tuple)) else choice for choice in (update or {}).get("choices", [])]
+
+def chat_scenario(session: GradioSession, rng: random.Random, context: dict) -> list[dict]:
+    question = rng.choice([
+        f"Who has experience with {rng.choice(SKILLS)}?",
+        f"Which candidates worked at {rng.choice(COMPANIES)}?",
+        f"Who studied at {rng.choice(UNIVERSITIES)}?",
+        f"Compare the candidates who know {rng.choice(SKILLS)} and {rng.choice(SKILLS)}.",
+    ])
+    # A per-request suffix keeps the answer cache from serving every repeat question
+    return [session.call("stream_chat_interface", f"{question} #{rng.randrange(10**6)}")]
+
+def summary_scenario(session: GradioSession, rng: random.Random, context: dict) -> list[dict]:
+    records = []
+    if not session.candidates:
+        # Opening the tab fills this session's dropdown; the summary call is validated against it
+        record = session.call("update_candidate_choices")
+        records.append(record)
+        session.candidates = choice_values((record.get("output") or [None])[0])
+        if not session.candidates:
+            return records
+    records.append(session.call("stream_summary_response", rng.choice(session.candidates)))
+    return records
+
+def skills_scenario(session: GradioSession, rng: random.Random, context: dict) -> list[dict]:
+    skills = ", ".join(rng.sample(SKILLS, rng.randint(1, 4)))
+    records = [session.call("update_choices", skills)]
+    output = records[0].get("output") or [None, None]
+    skill_choices = choice_values(output[0])
+    if skill_choices:
+        records.append(session.call("skill_scoring_interface_single_skill", skills, rng.choice(skill_choices)))
+    records.append(session.call("rank_candidates_interface", skills, 10))
+    return records
+
+def run_ingest_stage(session: GradioSession, api_name: str, *inputs, timeout: float = 600) -> dict:
+    # Ingestion handlers only queue a job stage; its latency runs until the session's job goes idle
+    start = time.perf_counter()
+    record = session.call(api_name, *inputs)
+    if record["error"]:
+        return record
+    deadline = start + timeout
+    while True:
+        status = session.call("ingest_status")
+        job = (status.get("output") or [{}])[0] or {}
+        if status["error"] or job.get("state") not in ("queued", "running"):
+            break
+        if time.perf_counter() > deadline:
+            record["error"] = "job timed out"
+            return record
+        time.sleep(0.1)
+    record["latency"] = time.perf_counter() - start
+    if status["error"]:
+        record["error"] = f"status: {status['error']}"
+    elif job.get("state") != "done":
+        record["error"] = f"job {job.get('state')}: {job.get('message')}"
+    return record
+
+def ingest_scenario(session: GradioSession, rng: random.Random, context: dict) -> list[dict]:
+    paths = rng.sample(context["corpus"], min(len(context["corpus"]), rng.randint(1, 3)))
+    try:
+        files = session.upload(paths)
+    except Exception as e:
+        return [{"endpoint": "upload", "error": f"{type(e).__name__}: {e}", "queue_wait": None, "ttft": None, "latency": None, "updates": 0}]
+    return [run_ingest_stage(session, "upload_and_process_files", files)]
+
+SCENARIOS = {"chat": chat_scenario, "summary": summary_scenario, "skills": skills_scenario, "ingest": ingest_scenario}
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name} (choose from {', '.join(SCENARIOS)})")
+        weights[name.strip()] = float(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+def run_user(user_id: int, args, config: dict, context: dict, stop: threading.Event, records: list, lock: threading.Lock):
+    import httpx
+    rng = random.Random(args.seed * 10_007 + user_id)
+    names, weights = zip(*context["mix"].items())
+    with httpx.Client(timeout=args.request_timeout) as http:
+        session = GradioSession(args.url, config, http)
+        while not stop.is_set():
+            scenario = rng.choices(names, weights)[0]
+            for record in SCENARIOS[scenario](session, rng, context):
+                record.pop("output", None)
+                record.update(scenario=scenario, finished_at=time.time())
+                with lock:
+                    records.append(record)
+            # Exponential think time, like independent users
+            if args.think_seconds > 0:
+                stop.wait(rng.expovariate(1 / args.think_seconds))
+
+def run_step(users: int, args, config: dict, context: dict) -> dict:
+    records = []
+    lock = threading.Lock()
+    stop = threading.Event()
+    threads = [threading.Thread(target=run_user, args=(i, args, config, context, stop, records, lock), daemon=True) for i in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.step_seconds)
+    stop.set()
+    # Requests in flight when the step ends still count; the drain is bounded by the request timeout
+    for thread in threads:
+        thread.join(timeout=args.request_timeout)
+    elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for record in records:
+        endpoints.setdefault(record["endpoint"], []).append(record)
+    report = {"users": users, "seconds": round(elapsed, 2), "requests": len(records), "endpoints": {}}
+    for endpoint, items in sorted(endpoints.items()):
+        ok = [r for r in items if not r["error"]]
+        errors = {}
+        for r in items:
+            if r["error"]:
+                errors[r["error"][:80]] = errors.get(r["error"][:80], 0) + 1
+        report["endpoints"][endpoint] = {
+            "requests": len(items),
+            "throughput_per_sec": round(len(ok) / elapsed, 3),
+            "error_rate": round(1 - len(ok) / len(items), 4),
+            "errors": errors,
+            "queue_wait": summarize([r["queue_wait"] for r in ok if r["queue_wait"] is not None]),
+            "ttft": summarize([r["ttft"] for r in ok if r["ttft"] is not None]),
+            "latency": summarize([r["latency"] for r in ok])
+        }
+    ok_total = sum(len([r for r in items if not r["error"]]) for items in endpoints.values())
+    report["throughput_per_sec"] = round(ok_total / elapsed, 3)
+    report["error_rate"] = round(1 - ok_total / len(records), 4) if records else 0.0
+    report["latency"] = summarize([r["latency"] for items in endpoints.values() for r in items if not r["error"]])
+    return report
+
+def find_saturation(steps: list[dict], gain: float = 0.1) -> int | None:
+    # The knee: more users stop buying throughput while latency keeps climbing (or errors appear)
+    for previous, current in itertools.pairwise(steps):
+        if not previous["throughput_per_sec"]:
+            continue
+        growth = current["throughput_per_sec"] / previous["throughput_per_sec"] - 1
+        p95_before = (previous["latency"] or {}).get("p95_ms") or 0
+        p95_now = (current["latency"] or {}).get("p95_ms") or 0
+        if current["error_rate"] > 0.01 or (growth < gain and p95_now > p95_before * 1.5):
+            return previous["users"]
+    return None
+
+def print_step(step: dict):
+    print(f"\n== {step['users']} user(s): {step['throughput_per_sec']:.2f} req/s, {step['error_rate']:.1%} errors ==")
+    print(f"{'endpoint':<40}{'req':>6}{'req/s':>9}{'err':>7}{'queue p95':>11}{'ttft p50':>10}{'ttft p95':>10}{'lat p50':>10}{'lat p95':>10}")
+    for name, endpoint in step["endpoints"].items():
+        def get(key, q, endpoint=endpoint):
+            return (endpoint[key] or {}).get(q, float("nan"))
+        print(f"{name:<40}{endpoint['requests']:>6}{endpoint['throughput_per_sec']:>9.2f}{endpoint['error_rate']:>7.1%}"
+              f"{get('queue_wait', 'p95_ms'):>11.0f}{get('ttft', 'p50_ms'):>10.0f}{get('ttft', 'p95_ms'):>10.0f}"
+              f"{get('latency', 'p50_ms'):>10.0f}{get('latency', 'p95_ms'):>10.0f}")
+        for error, count in endpoint["errors"].items():
+            print(f"    {count} x {error}")
+
+def wait_for_app(url: str, timeout: float = 120) -> dict:
+    import httpx
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = httpx.get(f"{url.rstrip('/')}/config", timeout=2)
+            if response.status_code == 200:
+                return response.json()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"App at {url} did not come up within {timeout:g}s")
+
+def launch_app(args, ollama_url: str, work_dir: Path) -> subprocess.Popen:
+    port = free_port()
+    args.url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "DATA_DIR": str(work_dir / "data"),
+        "OLLAMA_BASE_URL": ollama_url,
+        "LLM_MODEL": "fake-llm",
+        "EMBEDDING_MODEL": "fake-embed",
+        "GRADIO_SERVER_PORT": str(port),
+        "METRICS_PORT": str(args.metrics_port),
+        "ANONYMIZED_TELEMETRY": "False",
+        "PYTHONPATH": str(ROOT)
+    }
+    # The server writes through its own copy of the descriptor, so ours can be closed straight away
+    with open(work_dir / "app.log", "w") as log:
+        return subprocess.Popen([sys.executable, "run.py"], cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+def seed_app(args, config: dict, corpus: list[Path]):
+    import httpx
+    with httpx.Client(timeout=None) as http:
+        session = GradioSession(args.url, config, http)
+        for start in range(0, len(corpus), 100):
+            record = run_ingest_stage(session, "upload_and_process_files", session.upload(corpus[start:start + 100]))
+            if record["error"]:
+                raise RuntimeError(f"Seeding failed: {record['error']}")
+    print(f"Seeded the app with {len(corpus)} CV(s).")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="app to test; omit with --launch")
+    parser.add_argument("--launch", action="store_true", help="start a fake LLM and a throwaway app instance")
+    parser.add_argument("--seed-cvs", type=int, default=100, help="CVs to ingest into a launched app before the ramp")
+    parser.add_argument("--mix", default="chat=6,summary=2,skills=2", help="scenario weights, e.g. chat=6,summary=2,skills=2,ingest=1")
+    parser.add_argument("--steps", default="1,2,4,8,16", help="concurrent users per step")
+    parser.add_argument("--step-seconds", type=float, default=20)
+    parser.add_argument("--think-seconds", type=float, default=1.0, help="mean pause between a user's scenarios")
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--token-latency-ms", type=float, default=20, help="fake LLM: delay per streamed token")
+    parser.add_argument("--first-token-latency-ms", type=float, default=200, help="fake LLM: prompt processing delay")
+    parser.add_argument("--embed-latency-ms", type=float, default=5, help="fake LLM: delay per embedding request")
+    parser.add_argument("--metrics-port", type=int, default=0, help="expose the launched app's /metrics on this port")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write the full report as JSON")
+    args = parser.parse_args()
+
+    if not args.url and not args.launch:
+        parser.error("pass --url or --launch")
+
+    context = {"mix": parse_mix(args.mix), "corpus": []}
+    work_dir = Path(tempfile.mkdtemp(prefix="loadtest_"))
+    processes = []
+    try:
+        if args.launch or "ingest" in context["mix"]:
+            context["corpus"] = generate_corpus(work_dir / "corpus", max(args.seed_cvs, 30), seed=args.seed)
+        if args.launch:
+            fake_ollama, ollama_url = start_fake_ollama(args)
+            processes.append(fake_ollama)
+            processes.append(launch_app(args, ollama_url, work_dir))
+            print(f"Launched the app at {args.url} (logs in {work_dir / 'app.log'})")
+        config = wait_for_app(args.url)
+        if args.launch and args.seed_cvs:
+            seed_app(args, config, context["corpus"][:args.seed_cvs])
+
+        steps = []
+        for users in [int(step) for step in args.steps.split(",")]:
+            step = run_step(users, args, config, context)
+            steps.append(step)
+            print_step(step)
+
+        saturation = find_saturation(steps)
+        if saturation is None:
+            print("\nNo saturation point within the tested range.")
+        else:
+            print(f"\nThroughput stops scaling after about {saturation} concurrent user(s).")
+
+        if args.output:
+            args.output.parent.mkdir(parents=True, exist_ok=True)
+            args.output.write_text(json.dumps({
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+                "steps": steps,
+                "saturation_users": saturation
+            }, indent=2))
+            print(f"Saved report to {args.output}")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Benchmark the ingestion, chat, summary and skill paths at one or more corpus sizes.
+
+For every scale: generate (or reuse) a synthetic PDF/DOCX/TXT corpus, start the deterministic
+fake Ollama server, run benchmarks.stages in a fresh interpreter against a throwaway DATA_DIR,
+and collect throughput, p50/p95 latency and peak memory per stage into one JSON file.
+
+    python -m benchmarks.run --scales 100,1000
+    python -m benchmarks.compare benchmarks/results/baseline.json benchmarks/results/latest.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+from benchmarks.corpus import generate_corpus
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_fake_ollama(args) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_ollama", "--port", str(port),
+        "--token-latency-ms", str(args.token_latency_ms),
+        "--first-token-latency-ms", str(args.first_token_latency_ms),
+        "--embed-latency-ms", str(args.embed_latency_ms)
+    ], cwd=ROOT, stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{url}/api/tags", timeout=1)
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("fake Ollama server did not start")
+
+def get_corpus(scale: int, cache_dir: Path) -> Path:
+    # Corpora are deterministic, so they are generated once per scale and reused across runs
+    corpus_dir = cache_dir / f"corpus_{scale}"
+    if not corpus_dir.exists() or len(list(corpus_dir.iterdir())) != scale:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+        start = time.perf_counter()
+        generate_corpus(corpus_dir, scale)
+        print(f"Generated {scale} CV(s) in {time.perf_counter() - start:.1f}s")
+    return corpus_dir
+
+def run_stages(corpus_dir: Path, data_dir: Path, output: Path, args, ollama_url: str, extra: list[str] = ()) -> dict:
+    env = {
+        **os.environ,
+        "DATA_DIR": str(data_dir),
+        "OLLAMA_BASE_URL": ollama_url,
+        "LLM_MODEL": "fake-llm",
+        "EMBEDDING_MODEL": "fake-embed",
+        "METRICS_PORT": "0",
+        "ANONYMIZED_TELEMETRY": "False",
+        "PYTHONPATH": str(ROOT)
+    }
+    subprocess.run([
+        sys.executable, "-m", "benchmarks.stages", "--corpus", str(corpus_dir), "--output", str(output),
+        "--queries", str(args.queries), "--summaries", str(args.summaries), *extra
+    ], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL if not args.verbose else None)
+    return json.loads(output.read_text())
+
+def run_scale(scale: int, args, ollama_url: str) -> dict:
+    corpus_dir = get_corpus(scale, args.corpus_cache)
+    work_dir = Path(tempfile.mkdtemp(prefix=f"bench_{scale}_"))
+    try:
+        result = run_stages(corpus_dir, work_dir / "data", work_dir / "result.json", args, ollama_url)
+        # The upload pipeline starts from empty caches of its own
+        pipeline = run_stages(corpus_dir, work_dir / "pipeline_data", work_dir / "pipeline.json", args, ollama_url, ["--pipeline"])
+        result["stages"].update(pipeline["stages"])
+        return result
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_table(results: dict):
+    for scale, result in results["scales"].items():
+        print(f"\n== {scale} CVs ==")
+        print(f"{'stage':<20}{'ops':>8}{'ops/s':>12}{'p50 ms':>12}{'p95 ms':>12}{'peak MB':>10}")
+        for name, stage in result["stages"].items():
+            latency = stage["latency"] or {}
+            print(f"{name:<20}{stage['ops']:>8}{stage['throughput_per_sec'] or 0:>12.2f}"
+                  f"{latency.get('p50_ms', float('nan')):>12.2f}{latency.get('p95_ms', float('nan')):>12.2f}{stage['peak_rss_mb']:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="100", help="comma-separated corpus sizes, e.g. 100,1000,10000")
+    parser.add_argument("--queries", type=int, default=50, help="chat questions per scale")
+    parser.add_argument("--summaries", type=int, default=10, help="summaries per scale")
+    parser.add_argument("--token-latency-ms", type=float, default=0)
+    parser.add_argument("--first-token-latency-ms", type=float, default=0)
+    parser.add_argument("--embed-latency-ms", type=float, default=0)
+    parser.add_argument("--corpus-cache", type=Path, default=Path(tempfile.gettempdir()) / "recruiter_bench")
+    parser.add_argument("--output", type=Path, help="defaults to benchmarks/results/<timestamp>.json")
+    parser.add_argument("--keep", action="store_true", help="keep each scale's data directory")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own output")
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(",")]
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    output = args.output or RESULTS_DIR / f"{timestamp}.json"
+    results = {
+        "created_at": datetime.datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "corpus_cache", "keep", "verbose")},
+        "scales": {}
+    }
+
+    fake_ollama, url = start_fake_ollama(args)
+    try:
+        for scale in scales:
+            print(f"Running {scale} CVs...")
+            results["scales"][str(scale)] = run_scale(scale, args, url)
+    finally:
+        fake_ollama.terminate()
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print_table(results)
+    print(f"\nSaved results to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Runs every benchmark stage once against an isolated data directory and writes the results as JSON.
+
+Started by benchmarks.run in a fresh interpreter per scale, because the app reads its settings
+(DATA_DIR, OLLAMA_BASE_URL, ...) at import time.
+
+    DATA_DIR=/tmp/bench/data OLLAMA_BASE_URL=http://127.0.0.1:11500 python -m benchmarks.stages --corpus /tmp/bench/corpus --output out.json
+
+With --pipeline it only runs the upload path (IngestPipeline) instead, which needs a data directory of its own
+because the other stages leave every cache warm.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from benchmarks.stats import summarize
+
+QUESTIONS = [
+    "Who has experience with {skill}?",
+    "Which candidates worked at {company}?",
+    "Who studied at {university} and knows {skill}?",
+    "Summarize the {skill} experience of {name}.",
+    "Compare the candidates who know {skill} and {skill2}.",
+]
+SKILL_QUERIES = ["Python", "python, docker, kubernetes", "machine learning:2, sql", "C#, .NET, azure", "react, node.js:0.5, typescript"]
+
+def read_rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def child_pids(pid: int) -> list[int]:
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+class MemorySampler:
+    # Peak RSS of this process plus its children (the parser's process pool), sampled every few ms.
+    # Falls back to ru_maxrss, which only ever grows, where /proc isn't available.
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        pid = os.getpid()
+        while not self._stop.is_set():
+            pids = [pid] + child_pids(pid)
+            self.peak_kb = max(self.peak_kb, sum(read_rss_kb(p) for p in pids))
+            time.sleep(self.interval)
+
+    def reset(self):
+        self.peak_kb = 0
+
+    def peak_mb(self) -> float:
+        if self.peak_kb:
+            return round(self.peak_kb / 1024, 1)
+        import resource
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    def stop(self):
+        self._stop.set()
+
+class StageRecorder:
+    def __init__(self):
+        self.sampler = MemorySampler()
+        self.stages = {}
+
+    def run(self, name: str, func, ops_unit: str = "ops"):
+        # func returns (ops, latency samples in seconds, extra dict)
+        self.sampler.reset()
+        start = time.perf_counter()
+        ops, samples, extra = func()
+        wall = time.perf_counter() - start
+        self.stages[name] = {
+            "ops": ops,
+            "ops_unit": ops_unit,
+            "wall_seconds": round(wall, 4),
+            "throughput_per_sec": round(ops / wall, 3) if wall > 0 else None,
+            "latency": summarize(samples),
+            "peak_rss_mb": self.sampler.peak_mb(),
+            **extra
+        }
+        print(f"[bench] {name}: {ops} {ops_unit} in {wall:.2f}s", file=sys.stderr, flush=True)
+        return self.stages[name]
+
+def build_questions(count: int, names: list[str]) -> list[str]:
+    from benchmarks.corpus import COMPANIES, SKILLS, UNIVERSITIES
+    questions = []
+    for i in range(count):
+        template = QUESTIONS[i % len(QUESTIONS)]
+        # Every question differs, so the answer cache never hides the retrieval and generation cost
+        questions.append(template.format(
+            skill=SKILLS[i % len(SKILLS)], skill2=SKILLS[(i * 7 + 3) % len(SKILLS)],
+            company=COMPANIES[i % len(COMPANIES)], university=UNIVERSITIES[i % len(UNIVERSITIES)],
+            name=names[i % len(names)] if names else "Sara"
+        ) + f" ({i})")
+    return questions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, required=True)
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--summaries", type=int, default=10)
+    parser.add_argument("--pipeline", action="store_true", help="only run the ingest pipeline stage")
+    args = parser.parse_args()
+
+    recorder = StageRecorder()
+    start = time.perf_counter()
+    from app.chatbot import stream_answer
+    from app.summarizer import stream_summary
+    from app.skill_assessor import skill_scoring, rank_candidates
+    from app.utils.catalog import candidate_catalog
+    from app.utils.embedding import create_chroma
+    from app.utils.parser import parse_multiple, structure_and_save
+    from app.utils.pipeline import IngestPipeline
+    import_seconds = time.perf_counter() - start
+
+    files = sorted(args.corpus.iterdir())
+    state = {}
+
+    def parse_stage():
+        parsed = parse_multiple(files)
+        state["parsed"] = parsed
+        return len(parsed), [p["parse_seconds"] for p in parsed if "parse_seconds" in p], {"failed": len(files) - len(parsed)}
+
+    def parse_cached_stage():
+        # Same files again: every one should come from the artifact store
+        parsed = parse_multiple(files)
+        return len(parsed), [], {}
+
+    def structure_stage():
+        names, name_stats = structure_and_save(state["parsed"])
+        state["names"] = names
+        return len(names), [], {"names": name_stats}
+
+    def pipeline_stage():
+        # What an upload does: parse, name, chunk and index overlapped. The first CV is searchable as soon as
+        # its batch is written, long before the whole upload is done.
+        pipeline = IngestPipeline(files)
+        begin = time.perf_counter()
+        first = []
+        done = threading.Event()
+
+        def watch():
+            while not done.is_set():
+                if pipeline.counts["indexed"]:
+                    first.append(time.perf_counter() - begin)
+                    return
+                time.sleep(0.005)
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        try:
+            stats = pipeline.run()
+        finally:
+            done.set()
+            watcher.join()
+        return stats["counts"]["indexed"], [], {
+            "first_searchable_seconds": round(first[0], 4) if first else None,
+            "names": stats["names"],
+            "index": stats["index"]
+        }
+
+    def index_stage():
+        _, stats = create_chroma(full_rebuild=True)
+        return stats["added"], [], {"embedding": stats["embedding"]}
+
+    def index_noop_stage():
+        _, stats = create_chroma()
+        return stats["kept"], [], {"added": stats["added"]}
+
+    def chat_stage():
+        latencies, ttfts = [], []
+        for question in build_questions(args.queries, state["names"]):
+            begin = time.perf_counter()
+            first = None
+            for _ in stream_answer(question):
+                if first is None:
+                    first = time.perf_counter() - begin
+            latencies.append(time.perf_counter() - begin)
+            ttfts.append(first or latencies[-1])
+        return len(latencies), latencies, {"time_to_first_token": summarize(ttfts)}
+
+    def summary_stage():
+        latencies = []
+        for name in state["names"][:args.summaries]:
+            cv = candidate_catalog.read_text(name)
+            begin = time.perf_counter()
+            "".join(stream_summary(cv))
+            latencies.append(time.perf_counter() - begin)
+        return len(latencies), latencies, {}
+
+    def timed_calls(func, inputs):
+        latencies = []
+        for value in inputs:
+            begin = time.perf_counter()
+            func(value)
+            latencies.append(time.perf_counter() - begin)
+        return len(latencies), latencies, {}
+
+    if args.pipeline:
+        recorder.run("ingest_pipeline", pipeline_stage, "cvs")
+    else:
+        recorder.run("parse", parse_stage, "files")
+        recorder.run("parse_cached", parse_cached_stage, "files")
+        recorder.run("structure", structure_stage, "cvs")
+        recorder.run("index_build", index_stage, "chunks")
+        recorder.run("index_sync_noop", index_noop_stage, "chunks")
+        recorder.run("chat", chat_stage, "questions")
+        recorder.run("summary", summary_stage, "summaries")
+        # The first skill query also imports pandas and sets up the skill counter; it is reported on its own so warm queries aren't skewed
+        recorder.run("skill_first_query", lambda: timed_calls(skill_scoring, SKILL_QUERIES[:1]), "queries")
+        recorder.run("skill_scoring", lambda: timed_calls(skill_scoring, SKILL_QUERIES * 4), "queries")
+        recorder.run("rank_candidates", lambda: timed_calls(rank_candidates, SKILL_QUERIES * 4), "queries")
+    recorder.sampler.stop()
+
+    # The app prints progress to stdout, so results go to their own file
+    args.output.write_text(json.dumps({"files": len(files), "import_seconds": round(import_seconds, 4), "stages": recorder.stages}, indent=2))
+
+if __name__ == "__main__":
+    main()
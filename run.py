@@ -1,3 +1,13 @@
+import time
+start = time.perf_counter()
+
 from app.main import app
+from app.utils.metrics import start_metrics_server
+from app.utils.registry import registry
+
+registry.record_startup("import app.main", time.perf_counter() - start)
+
 if __name__=='__main__':
-    app.launch()
\ No newline at end of file
+    registry.log_startup()
+    start_metrics_server()
+    app.launch()
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from benchmarks.run import free_port
+
+# Settings are read when app is first imported, so everything is pointed somewhere disposable first
+FAKE_OLLAMA_PORT = free_port()
+os.environ.update({
+    "DATA_DIR": tempfile.mkdtemp(prefix="recruiter_tests_"),
+    "OLLAMA_BASE_URL": f"http://127.0.0.1:{FAKE_OLLAMA_PORT}",
+    "LLM_MODEL": "fake-llm",
+    "EMBEDDING_MODEL": "fake-embed",
+    "METRICS_PORT": "0",
+    "ANONYMIZED_TELEMETRY": "False"
+})
+
+@pytest.fixture(scope="session")
+def fake_ollama():
+    # The benchmarks' deterministic Ollama stand-in, slowed down enough that ingestion takes a few seconds
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_ollama", "--port", str(FAKE_OLLAMA_PORT),
+        "--first-token-latency-ms", "30", "--token-latency-ms", "2", "--embed-latency-ms", "20"
+    ], cwd=ROOT, stdout=subprocess.DEVNULL)
+    url = os.environ["OLLAMA_BASE_URL"]
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(f"{url}/api/tags", timeout=1)
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
@@ -0,0 +1,29 @@
+import time
+from types import SimpleNamespace
+from benchmarks.corpus import generate_corpus
+from app.utils.callbacks import clear_uploads, ingest_files
+from app.utils.catalog import candidate_catalog
+from app.utils.embedding import get_active_index, get_chunk_candidate, get_lexical_index, get_vectorstore
+from app.utils.jobs import ingest_jobs
+
+def test_clear_while_ingesting_leaves_no_candidates_behind(fake_ollama, tmp_path):
+    generate_corpus(tmp_path / "corpus", 40)
+    job = ingest_jobs.create("clear-mid-flight", sorted((tmp_path / "corpus").iterdir()))
+    ingest_jobs.run(job, "ingest", ingest_files)
+
+    # Clear once some CVs are searchable and more are still being named and indexed
+    deadline = time.monotonic() + 60
+    while not job.counts.get("indexed") and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert 0 < job.counts["indexed"] < job.counts["total"]
+
+    clear_uploads(SimpleNamespace(session_hash="clear-mid-flight"))
+
+    assert job.state == "cancelled"
+    assert job.created
+    cleared = set(job.created)
+    assert not cleared & set(candidate_catalog.names())
+    active = get_active_index()
+    chroma_ids = get_vectorstore(active["collection"])._collection.get(include=[])["ids"]
+    assert not {get_chunk_candidate(i) for i in chroma_ids} & cleared
+    assert not {get_chunk_candidate(i) for i in get_lexical_index(active["collection"]).ids()} & cleared
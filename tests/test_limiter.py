@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+from app.utils.limiter import RequestLimiter, background_limiter, ollama_limiter
+
+def hold(limiter: RequestLimiter, count: int) -> tuple[threading.Event, list[threading.Thread]]:
+    # Starts count threads that each hold a slot until the returned event is set
+    done = threading.Event()
+
+    def worker():
+        with limiter:
+            done.wait()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return done, threads
+
+def test_background_work_always_leaves_a_slot_for_chat():
+    assert background_limiter.max_concurrency < ollama_limiter.max_concurrency
+    # More background work than there are slots: summaries, name extraction and embeddings all at once
+    done, threads = hold(background_limiter, ollama_limiter.max_concurrency * 2)
+    try:
+        time.sleep(0.2)
+        assert background_limiter.in_flight == background_limiter.max_concurrency
+
+        async def ask():
+            async with ollama_limiter:
+                return True
+
+        assert asyncio.run(asyncio.wait_for(ask(), timeout=2))
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
+
+def test_cancelled_async_waiter_does_not_keep_a_slot():
+    limiter = RequestLimiter(2)
+    done, threads = hold(limiter, 2)
+
+    async def wait_then_cancel():
+        waiter = asyncio.create_task(limiter.__aenter__())
+        await asyncio.sleep(0.1)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+    asyncio.run(wait_then_cancel())
+    done.set()
+    for thread in threads:
+        thread.join()
+
+    # Once the holders leave, the cancelled waiter's slot is handed back, so both slots can be taken again
+    for _ in range(2):
+        assert limiter._semaphore.acquire(timeout=2)
@@ -0,0 +1,32 @@
+import os
+import time
+import app.utils.parser as parser
+
+PARSE_SECONDS = 0.2
+
+def slow_parse_cv(file_path):
+    time.sleep(PARSE_SECONDS)
+    if file_path.name == "poison.txt":
+        os._exit(1)
+    return {"filename": file_path.name, "text": file_path.read_text()}
+
+def test_one_crashing_file_fails_alone_and_the_rest_stay_parallel(tmp_path, monkeypatch):
+    files = []
+    for i in range(40):
+        path = tmp_path / f"cv{i}.txt"
+        path.write_text(f"{tmp_path.name} CV {i}")
+        files.append(path)
+    files.insert(5, tmp_path / "poison.txt")
+    files[5].write_text(f"{tmp_path.name} poison")
+    # Workers are forked, so they pick up the patched parser
+    monkeypatch.setattr(parser, "parse_cv", slow_parse_cv)
+
+    start = time.perf_counter()
+    results = list(parser.iter_parse_multiple(files, max_workers=4, timeout=30))
+    elapsed = time.perf_counter() - start
+
+    errors = {path.name: error for path, _, error in results if error}
+    assert errors == {"poison.txt": "parser process crashed"}
+    assert len(results) == len(files)
+    # 41 files one at a time take over 8s; four at a time, plus re-running the few that shared the crash, well under half that
+    assert elapsed < len(files) * PARSE_SECONDS / 2